@@ -3,27 +3,51 @@
 
 import os
 import sys
+import time
+
+# Measured from here: startup phases and time to first request (see /metrics)
+_started = time.monotonic()
 
 # Add the app directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask
+from flask import Flask, request
 from flask_socketio import SocketIO
 from flask_login import LoginManager
 from config import Config
-from database.db import init_db, check_db_initialized, run_migrations
+from database.db import query_stats, enable_green_io
+from database.migrations import migrate
+from services import background
+from services.metrics import register_collector, labelled
+from services.watchdog import get_watchdog
+from services.bus import socketio_options
 
 # Initialize extensions
 socketio = SocketIO()
 login_manager = LoginManager()
 
+# Seconds since _started: 'imports', 'schema', 'ready', 'first_request'
+startup_timings = {}
+
+register_collector(lambda: labelled(
+    'booping_startup_seconds', 'Seconds from process start to each startup milestone.',
+    startup_timings, 'phase'
+))
+
 
 def create_app():
+    startup_timings['imports'] = round(time.monotonic() - _started, 4)
     app = Flask(__name__)
     app.config.from_object(Config)
 
     # Initialize extensions
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*",
+                      **socketio_options(Config.SOCKETIO_MESSAGE_QUEUE))
+    background.configure(socketio)
+    if background.async_mode() == 'eventlet':
+        enable_green_io()
+    # Report event loop stalls from HTTP and Socket.IO traffic alike
+    get_watchdog().start()
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
@@ -42,16 +66,45 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp)
 
+    if Config.METRICS_ENABLED:
+        from routes.metrics import metrics_bp
+        app.register_blueprint(metrics_bp)
+
+    # Count DB queries per request (N+1 patterns show up in /metrics and logs)
+    @app.before_request
+    def begin_query_scope():
+        if 'first_request' not in startup_timings:
+            startup_timings['first_request'] = round(time.monotonic() - _started, 4)
+            print(f"First request {startup_timings['first_request'] * 1000:.0f} ms after start "
+                  f"(schema check {startup_timings['schema'] * 1000:.0f} ms)")
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        query_stats.begin_scope(f'{request.method} {rule}')
+
+    @app.after_request
+    def add_query_count(response):
+        count = query_stats.scope_count()
+        if count is not None:
+            response.headers['X-DB-Queries'] = str(count)
+        return response
+
+    @app.teardown_request
+    def end_query_scope(exc):
+        query_stats.end_scope()
+
     # Register socket events
     from socket_events.boop_events import register_socket_events
     register_socket_events(socketio)
 
-    # Initialize database if tables don't exist
+    # Maintenance commands (flask --app app <command>)
+    from cli import register_commands
+    register_commands(app)
+
+    # Create the database or apply pending migrations (one query when current)
+    schema_started = time.monotonic()
     with app.app_context():
-        if not check_db_initialized():
-            init_db()
-            print("Database initialized!")
-        run_migrations()
+        migrate()
+    startup_timings['schema'] = round(time.monotonic() - schema_started, 4)
+    startup_timings['ready'] = round(time.monotonic() - _started, 4)
 
     return app
 
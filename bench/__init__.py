@@ -0,0 +1,2 @@
+# Benchmarks package for BOOPING App
+# Created by Claude Opus 4.5
@@ -0,0 +1,430 @@
+# Boop throughput benchmark for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Starts bench/server.py against a throwaway SQLite database, connects N
+# Socket.IO clients that send boops at a fixed rate while REST clients load
+# pages, and prints a JSON report:
+#
+#   python -m bench.boop_bench --clients 20 --rate 5 --duration 30
+#   python -m bench.boop_bench --env BOOP_DURABILITY=buffered -o buffered.json
+#
+# Needs the Socket.IO client extras: pip install -r bench/requirements.txt
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict, deque
+from http.cookiejar import CookieJar
+
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# REST traffic mix (path, weight); /api/boop is sent as a POST
+REST_MIX = (
+    ('/api/bootstrap', 2),
+    ('/api/users', 3),
+    ('/api/users/me/stats', 3),
+    ('/api/boop', 2),
+)
+
+
+def percentiles(samples):
+    """Latency summary in milliseconds (nearest-rank percentiles)."""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50': rank(50),
+        'p95': rank(95),
+        'p99': rank(99),
+        'max': round(ordered[-1] * 1000, 2),
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class BenchServer:
+    """bench/server.py in a subprocess with its own throwaway database."""
+
+    def __init__(self, env_overrides):
+        self.tmpdir = tempfile.mkdtemp(prefix='booping-bench-')
+        self.port = _free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.log_path = os.path.join(self.tmpdir, 'server.log')
+        env = dict(os.environ)
+        env.pop('DATABASE_URL', None)
+        env['DATABASE_PATH'] = os.path.join(self.tmpdir, 'bench.db')
+        # Measure the app, not the limiter, unless asked otherwise
+        env.setdefault('MAX_BOOPS_PER_MINUTE', '1000000')
+        env.update(env_overrides)
+        self.env_overrides = env_overrides
+        self._log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'bench.server', '--port', str(self.port)],
+            cwd=ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                urllib.request.urlopen(self.url + '/login', timeout=1).read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f'Benchmark server did not start, see {self.log_path}')
+
+    def stats(self):
+        with urllib.request.urlopen(self.url + '/_bench/stats') as response:
+            return json.load(response)
+
+    def query_count(self):
+        return self.stats()['statements'].get('queries', 0)
+
+    def stop(self, keep=False):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+        if not keep:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class BenchUser:
+    """A registered account with its own cookie session."""
+
+    def __init__(self, base_url, username):
+        self.base_url = base_url
+        self.username = username
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.id = None
+
+    def register(self):
+        form = urllib.parse.urlencode({
+            'username': self.username, 'password': 'benchpass', 'display_name': self.username.title()
+        }).encode()
+        self.opener.open(self.base_url + '/register', form).read()
+        self.id = self.get_json('/api/users/me')['id']
+
+    def get_json(self, path):
+        with self.opener.open(self.base_url + path) as response:
+            return json.load(response)
+
+    def post_json(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path, json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        with self.opener.open(request) as response:
+            return json.load(response)
+
+    def cookie_header(self):
+        return '; '.join(f'{c.name}={c.value}' for c in self.cookies)
+
+
+class Recorder:
+    """Thread-safe latency bookkeeping shared by every client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending_acks = defaultdict(deque)    # sender id -> send times
+        self.in_flight = defaultdict(deque)       # (sender, recipient) -> send times
+        self.ack_latency = []
+        self.delivery_latency = []
+        self.sent = 0
+        self.acked = 0
+        self.errors = 0
+        self.rest_latency = defaultdict(list)
+        self.rest_errors = defaultdict(int)
+
+    def boop_sent(self, sender_id, recipient_id):
+        now = time.perf_counter()
+        with self.lock:
+            self.sent += 1
+            self.pending_acks[sender_id].append(now)
+            self.in_flight[(sender_id, recipient_id)].append(now)
+
+    def ack(self, sender_id, ok):
+        now = time.perf_counter()
+        with self.lock:
+            if not self.pending_acks[sender_id]:
+                return
+            started = self.pending_acks[sender_id].popleft()
+            if ok:
+                self.acked += 1
+                self.ack_latency.append(now - started)
+            else:
+                self.errors += 1
+
+    def delivered(self, sender_id, recipient_id, count=1):
+        now = time.perf_counter()
+        with self.lock:
+            queue = self.in_flight[(sender_id, recipient_id)]
+            for _ in range(min(count, len(queue))):
+                self.delivery_latency.append(now - queue.popleft())
+
+    def rest(self, path, elapsed, ok):
+        with self.lock:
+            if ok:
+                self.rest_latency[path].append(elapsed)
+            else:
+                self.rest_errors[path] += 1
+
+    def unacked(self):
+        with self.lock:
+            return sum(len(q) for q in self.pending_acks.values())
+
+
+def connect_socket(user, server_url, recorder, transports):
+    """Connect a Socket.IO client for `user` with handlers that feed the recorder."""
+    sio = socketio.Client(reconnection=False)
+
+    @sio.on('boop_sent')
+    def on_sent(data):
+        recorder.ack(user.id, True)
+
+    @sio.on('boop_error')
+    def on_error(data):
+        recorder.ack(user.id, False)
+
+    @sio.on('boop_received')
+    def on_received(data):
+        recorder.delivered(data['sender']['id'], user.id)
+
+    @sio.on('boops_received')
+    def on_batch(data):
+        for boop in data['boops']:
+            recorder.delivered(boop['sender']['id'], user.id, boop['count'])
+
+    sio.connect(server_url, headers={'Cookie': user.cookie_header()},
+                transports=transports, wait_timeout=10)
+    return sio
+
+
+def boop_loop(sio, user, recipients, rate, stop_at, recorder):
+    """Send boops at `rate` per second until `stop_at`."""
+    interval = 1 / rate
+    next_send = time.perf_counter() + random.random() * interval
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            return
+        if next_send > now:
+            time.sleep(min(next_send, stop_at) - now)
+            continue
+        recipient = random.choice(recipients)
+        recorder.boop_sent(user.id, recipient)
+        sio.emit('send_boop', {'recipient_id': recipient})
+        next_send += interval
+
+
+def rest_loop(user, recipients, rate, stop_at, recorder):
+    """Issue weighted REST requests at `rate` per second until `stop_at`."""
+    paths = [path for path, weight in REST_MIX for _ in range(weight)]
+    interval = 1 / rate
+    next_send = time.perf_counter()
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            return
+        if next_send > now:
+            time.sleep(min(next_send, stop_at) - now)
+            continue
+        path = random.choice(paths)
+        started = time.perf_counter()
+        try:
+            if path == '/api/boop':
+                user.post_json(path, {'recipient_id': random.choice(recipients)})
+            else:
+                user.get_json(path)
+            recorder.rest(path, time.perf_counter() - started, True)
+        except (urllib.error.URLError, OSError, ValueError):
+            recorder.rest(path, time.perf_counter() - started, False)
+        next_send += interval
+
+
+def profile_queries(server, users, sockets, recorder, samples, settle):
+    """DB queries per operation, measured one operation type at a time."""
+    sender, recipient = users[0], users[1]
+    operations = {
+        'send_boop': lambda: sockets[0].emit('send_boop', {'recipient_id': recipient.id}),
+        # Ten rapid clicks batched by the client into one event
+        'send_boops x10': lambda: sockets[0].emit('send_boops', {'recipient_id': recipient.id, 'count': 10}),
+        'GET /api/bootstrap': lambda: sender.get_json('/api/bootstrap'),
+        'GET /api/users': lambda: sender.get_json('/api/users'),
+        'GET /api/users/me/stats': lambda: sender.get_json('/api/users/me/stats'),
+        'POST /api/boop': lambda: sender.post_json('/api/boop', {'recipient_id': recipient.id}),
+    }
+    result = {}
+    for name, operation in operations.items():
+        time.sleep(settle)
+        before = server.query_count()
+        for _ in range(samples):
+            if name.startswith('send_boop'):
+                recorder.boop_sent(sender.id, recipient.id)
+            operation()
+        if name.startswith('send_boop'):
+            _wait_for_acks(recorder, 10)
+        # Let background flushes (buffered boops, counters) land in this window
+        time.sleep(settle)
+        result[name] = round((server.query_count() - before) / samples, 2)
+    return result
+
+
+def _wait_for_acks(recorder, timeout):
+    deadline = time.monotonic() + timeout
+    while recorder.unacked() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def run(args):
+    transports = ['websocket']
+    try:
+        import websocket  # noqa: F401  (websocket-client)
+    except ImportError:
+        transports = ['polling']
+
+    env_overrides = dict(item.split('=', 1) for item in args.env)
+    server = BenchServer(env_overrides)
+    sockets = []
+    try:
+        server.wait_ready()
+        users = [BenchUser(server.url, f'bench_{i:04d}') for i in range(max(args.clients, 2))]
+        for user in users:
+            user.register()
+        ids = [user.id for user in users]
+
+        # Query profile uses its own recorder so it stays out of the load numbers
+        profile_recorder = Recorder()
+        sockets = [connect_socket(users[0], server.url, profile_recorder, transports)]
+        queries_per_op = profile_queries(server, users, sockets, profile_recorder,
+                                         args.profile_samples, args.settle)
+        sockets[0].disconnect()
+
+        recorder = Recorder()
+        sockets = [connect_socket(user, server.url, recorder, transports) for user in users[:args.clients]]
+        time.sleep(args.settle)
+
+        queries_before = server.query_count()
+        started = time.perf_counter()
+        stop_at = started + args.duration
+        threads = []
+        for sio, user in zip(sockets, users):
+            recipients = [i for i in ids if i != user.id]
+            threads.append(threading.Thread(
+                target=boop_loop, args=(sio, user, recipients, args.rate, stop_at, recorder), daemon=True
+            ))
+        for i in range(args.rest_clients):
+            user = users[i % len(users)]
+            recipients = [u for u in ids if u != user.id]
+            threads.append(threading.Thread(
+                target=rest_loop, args=(user, recipients, args.rest_rate, stop_at, recorder), daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        _wait_for_acks(recorder, args.drain)
+        elapsed = time.perf_counter() - started
+        time.sleep(args.settle)
+        stats = server.stats()
+        load_queries = stats['statements'].get('queries', 0) - queries_before
+
+        rest_requests = sum(len(v) for v in recorder.rest_latency.values())
+        rest_boops = len(recorder.rest_latency.get('/api/boop', []))
+        return {
+            'config': {
+                'clients': args.clients,
+                'rate_per_client': args.rate,
+                'duration_s': args.duration,
+                'rest_clients': args.rest_clients,
+                'rest_rate_per_client': args.rest_rate,
+                'transport': transports[0],
+                'env': env_overrides,
+            },
+            'boops': {
+                'sent': recorder.sent,
+                'acked': recorder.acked,
+                'rejected': recorder.errors,
+                'unacked': recorder.unacked(),
+                'throughput_per_s': round(recorder.acked / elapsed, 2),
+            },
+            'ack_latency_ms': percentiles(recorder.ack_latency),
+            'delivery_latency_ms': percentiles(recorder.delivery_latency),
+            'rest': {
+                path: dict(percentiles(recorder.rest_latency.get(path, [])),
+                           errors=recorder.rest_errors.get(path, 0))
+                for path, _ in REST_MIX
+            },
+            'db': {
+                'queries_per_operation': queries_per_op,
+                'load_queries': load_queries,
+                'load_queries_per_boop': round(
+                    load_queries / max(1, recorder.acked + rest_boops), 2
+                ),
+                'rest_requests': rest_requests,
+                'pool': stats['pool'],
+            },
+        }
+    finally:
+        for sio in sockets:
+            if sio.connected:
+                sio.disconnect()
+        server.stop(keep=args.keep)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark boop throughput and latency.')
+    parser.add_argument('--clients', type=int, default=10, help='Socket.IO clients sending boops')
+    parser.add_argument('--rate', type=float, default=5, help='boops per second per client')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load')
+    parser.add_argument('--rest-clients', type=int, default=2, help='REST clients in the mix')
+    parser.add_argument('--rest-rate', type=float, default=5, help='requests per second per REST client')
+    parser.add_argument('--profile-samples', type=int, default=20, help='operations per query profile')
+    parser.add_argument('--settle', type=float, default=0.5, help='seconds to let background flushes land')
+    parser.add_argument('--drain', type=float, default=10, help='seconds to wait for outstanding acks')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='server environment override (repeatable)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--keep', action='store_true', help='keep the temp database and server log')
+    parser.add_argument('-o', '--output', help='also write the JSON report here')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    report = json.dumps(run(args), indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
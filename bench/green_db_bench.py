@@ -0,0 +1,123 @@
+# Event loop responsiveness benchmark for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Measures socket round-trip latency for an event that never touches the
+# database while other requests run long queries, once with DB calls on the
+# hub (DB_GREEN=off) and once kept off it (DB_GREEN=on):
+#
+#   python -m bench.green_db_bench --clients 10 --slow-clients 2 --duration 10
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+from bench.boop_bench import BenchServer, BenchUser, percentiles
+
+import socketio
+
+
+def probe_loop(sio, interval, stop_at, samples, lock):
+    """Round-trip a 'heartbeat' (acked, no DB work) every `interval` seconds."""
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        try:
+            sio.call('heartbeat', timeout=30)
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.append(elapsed)
+        except socketio.exceptions.TimeoutError:
+            pass
+        time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+def slow_loop(url, rows, stop_at, durations, lock):
+    """Keep one long query running at all times."""
+    while time.perf_counter() < stop_at:
+        with urllib.request.urlopen(f'{url}/_bench/slow-query?rows={rows}', timeout=120) as response:
+            seconds = json.load(response)['seconds']
+        with lock:
+            durations.append(seconds)
+
+
+def run_mode(args, green):
+    server = BenchServer({'DB_GREEN': 'on' if green else 'off', **dict(e.split('=', 1) for e in args.env)})
+    sockets = []
+    try:
+        server.wait_ready()
+        users = [BenchUser(server.url, f'probe_{i:04d}') for i in range(args.clients)]
+        for user in users:
+            user.register()
+        for user in users:
+            sio = socketio.Client(reconnection=False)
+            sio.connect(server.url, headers={'Cookie': user.cookie_header()},
+                        transports=args.transports, wait_timeout=10)
+            sockets.append(sio)
+
+        lock = threading.Lock()
+        baseline, loaded, queries = [], [], []
+
+        # Idle baseline, then the same probes with long queries running
+        stop_at = time.perf_counter() + args.baseline
+        threads = [threading.Thread(target=probe_loop, args=(s, args.interval, stop_at, baseline, lock))
+                   for s in sockets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stop_at = time.perf_counter() + args.duration
+        threads = [threading.Thread(target=probe_loop, args=(s, args.interval, stop_at, loaded, lock))
+                   for s in sockets]
+        threads += [threading.Thread(target=slow_loop, args=(server.url, args.rows, stop_at, queries, lock))
+                    for _ in range(args.slow_clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return {
+            'probe_latency_idle_ms': percentiles(baseline),
+            'probe_latency_under_load_ms': percentiles(loaded),
+            'slow_query_ms': percentiles(queries),
+        }
+    finally:
+        for sio in sockets:
+            if sio.connected:
+                sio.disconnect()
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket latency while long DB queries run.')
+    parser.add_argument('--clients', type=int, default=10, help='probing Socket.IO clients')
+    parser.add_argument('--interval', type=float, default=0.05, help='seconds between probes per client')
+    parser.add_argument('--slow-clients', type=int, default=2, help='concurrent long-query loops')
+    parser.add_argument('--rows', type=int, default=500000, help='size of each long query')
+    parser.add_argument('--baseline', type=float, default=3, help='seconds of idle probing')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of probing under load')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='server environment override (repeatable)')
+    parser.add_argument('-o', '--output', help='also write the JSON report here')
+    args = parser.parse_args()
+
+    try:
+        import websocket  # noqa: F401  (websocket-client)
+        args.transports = ['websocket']
+    except ImportError:
+        args.transports = ['polling']
+
+    report = json.dumps({
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'db_green_off': run_mode(args, green=False),
+        'db_green_on': run_mode(args, green=True),
+    }, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
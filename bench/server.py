@@ -0,0 +1,77 @@
+# Benchmark server for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Runs the app like a single eventlet worker, with every SQLite statement
+# counted. Started by bench/boop_bench.py; DATABASE_PATH must point at a
+# throwaway database.
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database.db as db
+
+# Statements that are bookkeeping rather than queries the app asked for
+OVERHEAD_PREFIXES = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'PRAGMA', 'SELECT 1')
+
+statements = Counter()
+
+
+def _count_statement(sql):
+    sql = sql.lstrip().upper()
+    statements['overhead' if sql.startswith(OVERHEAD_PREFIXES) else 'queries'] += 1
+
+
+_connect_sqlite = db._connect_sqlite
+
+
+def _traced_connect():
+    conn = _connect_sqlite()
+    conn.set_trace_callback(_count_statement)
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the app for benchmarking.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    if db.USE_POSTGRES or not os.environ.get('DATABASE_PATH'):
+        sys.exit('bench.server needs DATABASE_PATH set and DATABASE_URL unset')
+
+    # Must be swapped in before create_app() opens the pool
+    db._connect_sqlite = _traced_connect
+
+    from flask import jsonify, request
+    from app import app, socketio
+
+    @app.route('/_bench/stats')
+    def bench_stats():
+        return jsonify({'statements': dict(statements), 'pool': db.get_pool_stats()})
+
+    @app.route('/_bench/slow-query')
+    def bench_slow_query():
+        """A deliberately long read (a recursive count) for stall tests."""
+        rows = int(request.args.get('rows', 500000))
+        started = time.perf_counter()
+        db.query_db(
+            '''WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < ?)
+               SELECT COUNT(*) AS n FROM c''',
+            (rows,), one=True
+        )
+        return jsonify({'seconds': time.perf_counter() - started})
+
+    print(f"Benchmark server on http://{args.host}:{args.port}", flush=True)
+    socketio.run(app, host=args.host, port=args.port, log_output=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+# CLI commands for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Usage: flask --app app <command>
+
+import click
+
+
+def register_commands(app):
+    """Register maintenance commands on the Flask CLI."""
+
+    @app.cli.command('reconcile-stats')
+    def reconcile_stats():
+        """Rebuild global boop/user totals from the boops and users tables."""
+        from services.counters import get_counters
+        drift = get_counters().reconcile()
+        if not drift:
+            click.echo('Global stats already match the tables.')
+        for name, (old, new) in drift.items():
+            click.echo(f'{name}: {old} -> {new}')
+
+    @app.cli.command('rebuild-user-stats')
+    def rebuild_user_stats():
+        """Recompute per-user sent/received counters from the boops table."""
+        from models.boop import rebuild_user_stats
+        rebuild_user_stats()
+        click.echo('user_stats rebuilt.')
+
+    @app.cli.command('rebuild-boop-pairs')
+    def rebuild_boop_pairs():
+        """Recompute the Boop Buddies pair table from the boops table."""
+        from models.boop import rebuild_boop_pairs
+        rebuild_boop_pairs()
+        click.echo('boop_pairs rebuilt.')
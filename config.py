@@ -7,9 +7,81 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'boop-secret-key-change-in-production'
     DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'booping.db')
 
+    # Multiple workers (see "Scaling" in PROJECT-STATUS.md)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    # Message bus shared by the workers: local:///path.sock or redis://...
+    # With several workers it defaults to the bundled broker (started by
+    # gunicorn.conf.py); without one, emits would never leave their worker
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or (
+        'local:///tmp/booping-bus.sock' if WEB_CONCURRENCY > 1 else None
+    )
+    # Websocket-only clients keep each connection on one worker (no sticky sessions needed)
+    SOCKETIO_WEBSOCKET_ONLY = os.environ.get('SOCKETIO_WEBSOCKET_ONLY', str(WEB_CONCURRENCY > 1)).lower() == 'true'
+    # Per-worker state ('memory') or state shared by all workers ('database')
+    SHARED_STATE_BACKEND = os.environ.get('SHARED_STATE_BACKEND', 'database' if WEB_CONCURRENCY > 1 else 'memory')
+
+    # Presence: sockets heartbeat every ~25s and expire after PRESENCE_TIMEOUT_SECONDS
+    PRESENCE_TIMEOUT_SECONDS = float(os.environ.get('PRESENCE_TIMEOUT_SECONDS', 60))
+    PRESENCE_SWEEP_SECONDS = float(os.environ.get('PRESENCE_SWEEP_SECONDS', 15))
+
+    # Prometheus metrics at /metrics (off by default); with a token, scrapers
+    # must send "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Log (with the blocking stack) whenever the eventlet hub stalls longer than this (0 = off)
+    HUB_BLOCK_THRESHOLD_MS = float(os.environ.get('HUB_BLOCK_THRESHOLD_MS', 100))
+
+    # Password hashing: werkzeug method string with its cost parameters
+    # (scrypt:N:r:p or pbkdf2:sha256:iterations). Changing it rehashes each
+    # password at that user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Worker processes that hash (0 = real threads instead), at this nice level
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_NICE = int(os.environ.get('PASSWORD_HASH_NICE', 5))
+    # Logins/registrations hashing at once; others wait up to LOGIN_WAIT_SECONDS, then get a 503
+    LOGIN_MAX_IN_FLIGHT = int(os.environ.get('LOGIN_MAX_IN_FLIGHT', 8))
+    LOGIN_WAIT_SECONDS = float(os.environ.get('LOGIN_WAIT_SECONDS', 5))
+
     # Rate limiting
     # NOTE: Will likely need tuning based on usage
-    MAX_BOOPS_PER_MINUTE = 200
+    MAX_BOOPS_PER_MINUTE = int(os.environ.get('MAX_BOOPS_PER_MINUTE', 200))
+    # Most boops one send_boops event may carry (matches MAX_BOOPS_PER_BATCH in socket.js)
+    MAX_BOOPS_PER_BATCH = int(os.environ.get('MAX_BOOPS_PER_BATCH', 50))
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', SHARED_STATE_BACKEND)
+
+    # Boop write durability
+    # 'sync'     - each boop is committed before it is acknowledged
+    # 'buffered' - boops are queued and written in batches for much higher
+    #              throughput; a crash can lose up to one flush interval of boops
+    BOOP_DURABILITY = os.environ.get('BOOP_DURABILITY', 'sync')
+    BOOP_FLUSH_INTERVAL_MS = int(os.environ.get('BOOP_FLUSH_INTERVAL_MS', 50))
+    BOOP_FLUSH_MAX_ROWS = int(os.environ.get('BOOP_FLUSH_MAX_ROWS', 500))
+    BOOP_QUEUE_MAX = int(os.environ.get('BOOP_QUEUE_MAX', 10000))
+
+    # Coalesce boops per recipient into one socket frame over this window
+    # (0 = emit one boop_received per boop)
+    BOOP_COALESCE_MS = int(os.environ.get('BOOP_COALESCE_MS', 0))
+
+    # Global counters: increments are folded into global_stats periodically,
+    # reads are cached, and the totals are rebuilt from COUNT(*) to fix drift
+    GLOBAL_STATS_FLUSH_SECONDS = float(os.environ.get('GLOBAL_STATS_FLUSH_SECONDS', 2))
+    GLOBAL_STATS_CACHE_SECONDS = float(os.environ.get('GLOBAL_STATS_CACHE_SECONDS', 1))
+    GLOBAL_STATS_RECONCILE_SECONDS = float(os.environ.get('GLOBAL_STATS_RECONCILE_SECONDS', 3600))
+    GLOBAL_STATS_TICK_SECONDS = float(os.environ.get('GLOBAL_STATS_TICK_SECONDS', 1))
+
+    # User directory paging (/api/users)
+    USER_DIRECTORY_PAGE_SIZE = 50
+    USER_DIRECTORY_MAX_PAGE_SIZE = 200
+
+    # last_active / last_login writes are batched every ACTIVITY_FLUSH_SECONDS;
+    # touches within ACTIVITY_GRANULARITY_SECONDS of the last write stay in memory
+    ACTIVITY_FLUSH_SECONDS = float(os.environ.get('ACTIVITY_FLUSH_SECONDS', 5))
+    ACTIVITY_GRANULARITY_SECONDS = float(os.environ.get('ACTIVITY_GRANULARITY_SECONDS', 30))
+
+    # User cache (Flask-Login loader and recipient lookups)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 5000))
+    USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
 
     # User constraints (5 lines × 40 chars = 200)
     MAX_DISPLAY_NAME_LENGTH = 200
@@ -2,48 +2,285 @@
 # Created by Claude Opus 4.5
 # Updated: PostgreSQL support for Railway deployment
 
+import atexit
 import os
 import sqlite3
 from contextlib import contextmanager
+from functools import lru_cache
 from urllib.parse import urlparse
 
+from database.instrumentation import QueryStats
+from database.pool import ConnectionPool
+from database.sqlite_writer import SQLiteWriter
+from database.statements import Statement
+from services.metrics import register_collector, labelled
+
 # Check for PostgreSQL (Railway sets DATABASE_URL)
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
 if DATABASE_URL:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
+    from psycopg2.extras import RealDictCursor, execute_values
     USE_POSTGRES = True
 else:
     USE_POSTGRES = False
-    DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'booping.db')
+    DATABASE_PATH = os.environ.get('DATABASE_PATH') or os.path.join(os.path.dirname(__file__), 'booping.db')
 
 SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
 
+# Run declared statements as server-side prepared statements on PostgreSQL
+# (set DB_PREPARE=off behind a transaction-pooling proxy such as PgBouncer)
+PREPARE_STATEMENTS = os.environ.get('DB_PREPARE', 'on').lower() != 'off'
 
-@contextmanager
-def get_db():
-    """Context manager for database connections."""
+# SQLite engine: 'wal' (WAL journal, pooled read connections, every write
+# serialized through one writer task) or 'legacy' (rollback journal, one
+# shared connection for reads and writes)
+SQLITE_ENGINE = os.environ.get('SQLITE_ENGINE', 'wal').lower()
+SQLITE_WAL = not USE_POSTGRES and SQLITE_ENGINE != 'legacy'
+# NORMAL is safe in WAL mode (a power cut can lose the last commits, never
+# corrupt the file); FULL fsyncs every commit
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_CACHE_KB = int(os.environ.get('SQLITE_CACHE_KB', 20000))
+SQLITE_MMAP_BYTES = int(os.environ.get('SQLITE_MMAP_BYTES', 256 * 1024 * 1024))
+# Most queued single-statement writes grouped into one transaction
+SQLITE_WRITE_BATCH = int(os.environ.get('SQLITE_WRITE_BATCH', 200))
+# Bound parameters per statement (SQLite builds before 3.32 allow 999)
+SQLITE_MAX_VARIABLES = 999
+
+# Pool sizing (legacy SQLite shares one persistent connection; in WAL mode
+# the pool only holds read connections)
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10 if USE_POSTGRES else 4 if SQLITE_WAL else 1))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+POOL_RECYCLE = float(os.environ.get('DB_POOL_RECYCLE', 30))
+
+# Instrumentation: statements slower than this are logged with their call
+# site (0 disables); requests/socket events running more queries than
+# DB_QUERY_SCOPE_WARN are logged as possible N+1 patterns
+SLOW_QUERY_MS = float(os.environ.get('DB_SLOW_QUERY_MS', 200))
+QUERY_SCOPE_WARN = int(os.environ.get('DB_QUERY_SCOPE_WARN', 25))
+
+query_stats = QueryStats(slow_ms=SLOW_QUERY_MS, scope_warn=QUERY_SCOPE_WARN)
+register_collector(query_stats.collect)
+
+# Under eventlet, keep DB calls from blocking the hub ('off' to disable)
+GREEN_DB = os.environ.get('DB_GREEN', 'on').lower() != 'off'
+
+_pool = None
+_writer = None
+_offload = None  # eventlet.tpool.execute once enable_green_io() runs on SQLite
+
+
+if USE_POSTGRES:
+    class _PreparingConnection(psycopg2.extensions.connection):
+        """Connection that remembers which statements it has prepared."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.prepared = set()
+
+
+def _connect_postgres():
+    conn = psycopg2.connect(DATABASE_URL, connection_factory=_PreparingConnection)
+    conn.autocommit = False
+    return conn
+
+
+def _reset_postgres(conn):
+    # Never hand out a connection that is idle in a transaction
+    if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+
+
+def _connect_sqlite():
+    conn = sqlite3.connect(DATABASE_PATH, timeout=POOL_TIMEOUT,
+                           check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    if SQLITE_WAL:
+        # journal_mode is stored in the file; the rest are per connection
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(f'PRAGMA synchronous = {SQLITE_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_KB}')
+        conn.execute(f'PRAGMA mmap_size = {SQLITE_MMAP_BYTES}')
+    return conn
+
+
+def _connect_sqlite_writer():
+    conn = _connect_sqlite()
+    # Autocommit; the writer issues BEGIN IMMEDIATE/COMMIT itself
+    conn.isolation_level = None
+    return conn
+
+
+def _reset_sqlite(conn):
+    if conn.in_transaction:
+        conn.rollback()
+
+
+def _ping(conn):
+    conn.cursor().execute('SELECT 1')
+
+
+def _eventlet_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback: park the green thread on the hub, not the OS thread."""
+    from eventlet.hubs import trampoline
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        if state == psycopg2.extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f'Bad result from poll: {state}')
+
+
+def enable_green_io():
+    """Stop database calls from blocking the eventlet hub.
+
+    PostgreSQL: psycopg2 waits for the server through the hub (wait
+    callback), so other green threads run while a query is in flight.
+    SQLite: each call runs in eventlet's bounded pool of real threads
+    (tpool, EVENTLET_THREADPOOL_SIZE) and the green thread waits for it.
+    """
+    global _offload
+    if not GREEN_DB:
+        return
     if USE_POSTGRES:
-        conn = psycopg2.connect(DATABASE_URL)
-        conn.autocommit = False
+        psycopg2.extensions.set_wait_callback(_eventlet_wait_callback)
     else:
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row
-        conn.execute('PRAGMA foreign_keys = ON')
-    try:
+        from eventlet import tpool
+        _offload = tpool.execute
+
+
+def _blocking(func, *args):
+    """Run a call that may block on the database (off the hub when offloading)."""
+    if _offload is None:
+        return func(*args)
+    return _offload(func, *args)
+
+
+def _fetch_all(conn, query, args):
+    return conn.execute(query, args).fetchall()
+
+
+def _execute_and_commit(conn, query, args):
+    cur = conn.execute(query, args)
+    conn.commit()
+    return cur
+
+
+def _execute_write(conn, query, args):
+    return conn.execute(query, args).lastrowid
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        if USE_POSTGRES:
+            _pool = ConnectionPool(
+                _connect_postgres, max_size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                recycle_after=POOL_RECYCLE, ping=_ping, reset=_reset_postgres,
+                is_closed=lambda conn: conn.closed != 0,
+                on_checkout=query_stats.record_acquire
+            )
+        else:
+            _pool = ConnectionPool(
+                _connect_sqlite, max_size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                recycle_after=POOL_RECYCLE, ping=_ping, reset=_reset_sqlite,
+                on_checkout=query_stats.record_acquire
+            )
+        atexit.register(_pool.close_all)
+    return _pool
+
+
+def _get_writer():
+    """The SQLite writer (WAL engine only; None otherwise)."""
+    global _writer
+    if _writer is None and SQLITE_WAL:
+        _writer = SQLiteWriter(
+            _connect_sqlite_writer, _blocking,
+            batch_size=SQLITE_WRITE_BATCH, on_lease=query_stats.record_acquire
+        )
+    return _writer
+
+
+@contextmanager
+def get_db():
+    """Context manager for pooled database connections.
+
+    Connections are returned to the pool (with any uncommitted work rolled
+    back) instead of being closed. Nested calls in the same greenlet share
+    one connection; inside a WAL-mode transaction() that is the writer's.
+    """
+    writer = _get_writer()
+    if writer is not None and writer.holds_lease():
+        yield writer.connection
+        return
+    with _get_pool().connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 
+def get_pool_stats():
+    """Get connection pool usage (in use, waiting, checkout latency)."""
+    return _get_pool().stats()
+
+
+@register_collector
+def _collect_pool_stats():
+    stats = get_pool_stats()
+    lines = labelled('booping_db_pool', 'Connection pool usage (see get_pool_stats).',
+                     {key: value for key, value in stats.items() if not key.endswith('_ms')}, 'stat')
+    if _writer is not None:
+        lines += labelled('booping_sqlite_writer', 'SQLite writer queue and batching.',
+                          _writer.stats(), 'stat')
+    return lines
+
+
+@lru_cache(maxsize=1024)
 def _convert_query(query):
-    """Convert SQLite ? placeholders to PostgreSQL %s."""
+    """Convert SQLite ? placeholders to PostgreSQL %s (cached per query string)."""
     if USE_POSTGRES:
         return query.replace('?', '%s')
     return query
 
 
+@lru_cache(maxsize=1024)
+def _postgres_write_query(query):
+    """Converted write query, with RETURNING id added to INSERTs into tables that have an id."""
+    query = _convert_query(query)
+    upper = query.upper()
+    # user_badges has a composite key, no id column
+    if 'INSERT' in upper and 'RETURNING' not in upper and 'user_badges' not in query.lower():
+        query = query.rstrip(';') + ' RETURNING id'
+    return query
+
+
+def _statement_sql(cursor, query):
+    """SQL to run for a declared Statement or a raw (SQLite-style) query.
+
+    On PostgreSQL a Statement is prepared the first time this connection
+    sees it, then run with EXECUTE.
+    """
+    if not isinstance(query, Statement):
+        return _convert_query(query)
+    if not USE_POSTGRES:
+        return query.sql
+    if not PREPARE_STATEMENTS:
+        return query.postgres_sql
+    conn = cursor.connection
+    if query.name not in conn.prepared:
+        cursor.execute(query.prepare_sql)
+        conn.prepared.add(query.name)
+    return query.execute_sql
+
+
+def _query_text(query):
+    return query.sql if isinstance(query, Statement) else query
+
+
 def _row_to_dict(row, cursor):
     """Convert a database row to a dict-like object."""
     if USE_POSTGRES:
@@ -61,47 +298,171 @@ class DictRow(dict):
 
 
 def query_db(query, args=(), one=False):
-    """Execute a query and return results."""
-    query = _convert_query(query)
+    """Execute a query (SQL text or a declared Statement) and return results."""
     with get_db() as conn:
         if USE_POSTGRES:
             cur = conn.cursor()
-            cur.execute(query, args)
-            rows = cur.fetchall()
+            with query_stats.timed(_query_text(query)):
+                cur.execute(_statement_sql(cur, query), args)
+                rows = cur.fetchall()
             if not rows:
                 return None if one else []
             columns = [desc[0] for desc in cur.description]
             results = [DictRow(zip(columns, row)) for row in rows]
             return results[0] if one else results
         else:
-            cur = conn.execute(query, args)
-            rv = cur.fetchall()
+            query = _query_text(query)
+            with query_stats.timed(query):
+                rv = _blocking(_fetch_all, conn, query, args)
             return (rv[0] if rv else None) if one else rv
 
 
 def execute_db(query, args=()):
-    """Execute a query that modifies data."""
-    query = _convert_query(query)
+    """Execute a query that modifies data.
+
+    Returns the new row id for INSERTs (declared Statements only when they
+    set `returning`). In SQLite WAL mode the write is queued for the writer,
+    which commits it together with any other writes waiting at the time.
+    """
+    writer = _get_writer()
+    if writer is not None:
+        query = _query_text(query)
+        with query_stats.timed(query):
+            return writer.submit(_execute_write, query, args)
+
     with get_db() as conn:
         if USE_POSTGRES:
             cur = conn.cursor()
-            # Handle RETURNING for INSERT statements
-            # Skip for user_badges which has composite key, no id column
-            if 'INSERT' in query.upper() and 'RETURNING' not in query.upper():
-                if 'user_badges' not in query.lower():
-                    query = query.rstrip(';') + ' RETURNING id'
-            cur.execute(query, args)
-            conn.commit()
+            with query_stats.timed(_query_text(query)):
+                if isinstance(query, Statement):
+                    cur.execute(_statement_sql(cur, query), args)
+                else:
+                    cur.execute(_postgres_write_query(query), args)
+                conn.commit()
             if cur.description:
                 result = cur.fetchone()
                 return result[0] if result else None
             return None
         else:
-            cur = conn.execute(query, args)
-            conn.commit()
+            query = _query_text(query)
+            with query_stats.timed(query):
+                cur = _blocking(_execute_and_commit, conn, query, args)
             return cur.lastrowid
 
 
+class Transaction:
+    """Cursor wrapper for running several statements as one transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+    def execute(self, query, args=()):
+        """Execute SQL text (placeholders are converted for PostgreSQL) or a declared Statement."""
+        with query_stats.timed(_query_text(query)):
+            _blocking(self.cursor.execute, _statement_sql(self.cursor, query), args)
+        return self.cursor
+
+    def executemany(self, query, seq_of_args):
+        """Execute a statement once per argument tuple."""
+        with query_stats.timed(_query_text(query)):
+            _blocking(self.cursor.executemany, _statement_sql(self.cursor, query), seq_of_args)
+        return self.cursor
+
+    def insert(self, query, args=()):
+        """Execute an INSERT and return the new row id.
+
+        Declared Statements must say returning='id'.
+        """
+        with query_stats.timed(_query_text(query)):
+            if USE_POSTGRES:
+                if isinstance(query, Statement):
+                    self.cursor.execute(_statement_sql(self.cursor, query), args)
+                else:
+                    self.cursor.execute(_convert_query(query).rstrip(';') + ' RETURNING id', args)
+                return self.cursor.fetchone()[0]
+            _blocking(self.cursor.execute, _query_text(query), args)
+            return self.cursor.lastrowid
+
+    def insert_many(self, table, columns, rows):
+        """Insert many rows at once.
+
+        Both databases get multi-row INSERTs: one per 1000 rows on
+        PostgreSQL, one per SQLITE_MAX_VARIABLES parameters on SQLite.
+        """
+        column_list = ', '.join(columns)
+        if USE_POSTGRES:
+            query = f'INSERT INTO {table} ({column_list}) VALUES %s'
+            with query_stats.timed(query):
+                execute_values(self.cursor, query, rows, page_size=1000)
+        else:
+            row_placeholders = '(' + ', '.join('?' for _ in columns) + ')'
+            query = f'INSERT INTO {table} ({column_list}) VALUES {row_placeholders}'
+            chunk_size = max(1, SQLITE_MAX_VARIABLES // len(columns))
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                chunk_query = query + f', {row_placeholders}' * (len(chunk) - 1)
+                args = [value for row in chunk for value in row]
+                with query_stats.timed(query):
+                    _blocking(self.cursor.execute, chunk_query, args)
+
+    def update_many(self, table, column, rows, cast=None):
+        """Set `column` on many rows, given (id, value) pairs.
+
+        PostgreSQL gets a single UPDATE ... FROM (VALUES ...); `cast` names
+        the column type for the VALUES list (e.g. 'timestamp'). SQLite uses
+        executemany inside the transaction.
+        """
+        if USE_POSTGRES:
+            value = f'%s::{cast}' if cast else '%s'
+            query = f'''UPDATE {table} AS t SET {column} = v.value
+                    FROM (VALUES %s) AS v(id, value)
+                    WHERE t.id = v.id'''
+            with query_stats.timed(query):
+                execute_values(self.cursor, query, rows, template=f'(%s, {value})', page_size=1000)
+        else:
+            query = f'UPDATE {table} SET {column} = ? WHERE id = ?'
+            with query_stats.timed(query):
+                _blocking(self.cursor.executemany, query, [(value, row_id) for row_id, value in rows])
+
+
+@contextmanager
+def transaction():
+    """Run a block of statements on one connection and commit them together.
+
+    Rolls back if the block raises. In SQLite WAL mode the block holds the
+    writer connection (BEGIN IMMEDIATE) until it ends; a nested transaction()
+    joins the outer one.
+    """
+    writer = _get_writer()
+    if writer is not None:
+        with writer.lease() as conn:
+            outermost = not conn.in_transaction
+            if outermost:
+                _blocking(conn.execute, 'BEGIN IMMEDIATE')
+            tx = Transaction(conn)
+            try:
+                yield tx
+                if outermost:
+                    with query_stats.timed('COMMIT'):
+                        _blocking(conn.execute, 'COMMIT')
+            except Exception:
+                if outermost and conn.in_transaction:
+                    _blocking(conn.execute, 'ROLLBACK')
+                raise
+        return
+
+    with get_db() as conn:
+        tx = Transaction(conn)
+        try:
+            yield tx
+            with query_stats.timed('COMMIT'):
+                _blocking(conn.commit)
+        except Exception:
+            _blocking(conn.rollback)
+            raise
+
+
 def init_db():
     """Initialize the database from schema."""
     with get_db() as conn:
@@ -143,57 +504,81 @@ def check_db_initialized():
         return False
 
 
-def run_migrations():
-    """Run any necessary database migrations."""
-    if not USE_POSTGRES:
-        return
+# Tables added after the initial schema (same DDL for both databases),
+# created on existing databases by migration 1 (database/migrations.py).
+# Derived tables carry the statements that rebuild them from boops. Later
+# tables belong in schema.sql plus a new migration.
+ADDED_TABLES = {
+    'rate_limits': {
+        'create': '''CREATE TABLE IF NOT EXISTS rate_limits (
+            bucket TEXT NOT NULL,
+            window_start INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, window_start)
+        )''',
+        'rebuild': None,
+    },
+    'presence': {
+        'create': '''CREATE TABLE IF NOT EXISTS presence (
+            user_id INTEGER NOT NULL,
+            worker TEXT NOT NULL,
+            last_seen INTEGER NOT NULL,
+            PRIMARY KEY (user_id, worker)
+        )''',
+        'rebuild': None,
+    },
+    'user_stats': {
+        'create': '''CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY REFERENCES users(id),
+            boops_sent INTEGER NOT NULL DEFAULT 0,
+            boops_received INTEGER NOT NULL DEFAULT 0
+        )''',
+        'rebuild': [
+            'DELETE FROM user_stats',
+            '''INSERT INTO user_stats (user_id, boops_sent, boops_received)
+               SELECT u.id,
+                      (SELECT COUNT(*) FROM boops b WHERE b.sender_id = u.id),
+                      (SELECT COUNT(*) FROM boops b WHERE b.recipient_id = u.id)
+               FROM users u''',
+        ],
+    },
+    'boop_pairs': {
+        'create': '''CREATE TABLE IF NOT EXISTS boop_pairs (
+            sender_id INTEGER NOT NULL REFERENCES users(id),
+            recipient_id INTEGER NOT NULL REFERENCES users(id),
+            boop_count INTEGER NOT NULL DEFAULT 0,
+            is_mutual INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sender_id, recipient_id)
+        )''',
+        'rebuild': [
+            'DELETE FROM boop_pairs',
+            '''INSERT INTO boop_pairs (sender_id, recipient_id, boop_count, is_mutual)
+               SELECT sender_id, recipient_id, COUNT(*), 0
+               FROM boops
+               GROUP BY sender_id, recipient_id''',
+            '''UPDATE boop_pairs SET is_mutual = 1
+               WHERE EXISTS (
+                   SELECT 1 FROM boop_pairs r
+                   WHERE r.sender_id = boop_pairs.recipient_id
+                   AND r.recipient_id = boop_pairs.sender_id
+               )''',
+        ],
+    },
+}
 
-    with get_db() as conn:
-        cur = conn.cursor()
-        try:
-            # Update display_name constraint from 50 to 200 chars
-            cur.execute("ALTER TABLE users DROP CONSTRAINT IF EXISTS users_display_name_check")
-            cur.execute("ALTER TABLE users ADD CONSTRAINT users_display_name_check CHECK (length(display_name) <= 200)")
-            conn.commit()
-        except Exception as e:
-            print(f"Migration note (constraint): {e}")
-            conn.rollback()
 
-        # Badge seeding/update migration - ensures badges exist with correct thresholds
-        try:
-            badge_data = [
-                ('First Boop', 'Sent your first boop!', 1, '🐾', None),
-                ('Booper', 'Sent 100 boops', 100, '🐾🐾', 'sparkle'),
-                ('Super Booper', 'Sent 200 boops', 200, '✨🐾', 'ghost'),
-                ('Boop Master', 'Sent 1,000 boops', 1000, '👑🐾', 'fire'),
-                ('Boop Legend', 'Sent 2,000 boops', 2000, '🌟👑🐾', 'rainbow'),
-                ('Generous Soul', 'Sent 4,000 boops', 4000, '💯', 'star'),
-                ('Boop Giver', 'Sent 10,000 boops', 10000, '🌟', 'heart'),
-                ('Boop Philanthropist', 'Sent 10,000 boops', 10000, '💖', 'galaxy'),
-                ('Spooky Booper', 'Sent 10,001 boops', 10001, '💀', 'skeleton'),
-                ('Extraterrestrial', 'Sent 12,000 boops', 12000, '👽', 'alien'),
-                ('Mechanical Mind', 'Sent 14,000 boops', 14000, '🤖', 'robot'),
-                ('Solar Flare', 'Sent 16,000 boops', 16000, '☀️', 'sun'),
-                ('Thunder Strike', 'Sent 18,000 boops', 18000, '⚡', 'lightning'),
-                ('Frozen Heart', 'Sent 20,001 boops', 20001, '❄️', 'snowflake'),
-            ]
-            for name, desc, threshold, icon, paw in badge_data:
-                cur.execute('''
-                    INSERT INTO badges (name, description, threshold, icon, unlocks_paw)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT (name) DO UPDATE SET
-                        description = EXCLUDED.description,
-                        threshold = EXCLUDED.threshold,
-                        icon = EXCLUDED.icon,
-                        unlocks_paw = EXCLUDED.unlocks_paw
-                ''', (name, desc, threshold, icon, paw))
-            conn.commit()
-            print("Badge migration completed - badges seeded/updated.")
-        except Exception as e:
-            print(f"Badge migration error: {e}")
-            conn.rollback()
+# Indexes added after the initial schema
+ADDED_INDEXES = [
+    # Keyset pagination for the user directory
+    'CREATE INDEX IF NOT EXISTS idx_users_active_id ON users(last_active, id)',
+]
+
 
-        print("Database migrations completed.")
+def rebuild_derived_table(name):
+    """Recompute a derived table (e.g. user_stats) from the boops table."""
+    with transaction() as tx:
+        for statement in ADDED_TABLES[name]['rebuild']:
+            tx.execute(statement)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,133 @@
+# Query instrumentation for BOOPING App
+# Created by Claude Opus 4.5
+
+import os
+import re
+import time
+import traceback
+
+from services import background
+from services.metrics import Histogram, gauge
+
+# Seconds; most queries here are sub-millisecond on SQLite
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SCOPE_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 50, 100)
+
+_DATABASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_DATABASE_DIR)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(query):
+    """Collapse a statement to its shape: literals and placeholder lists become ?/(...)."""
+    query = _WHITESPACE.sub(' ', query).strip().replace('%s', '?')
+    query = _LITERALS.sub('?', query)
+    return _PLACEHOLDER_LISTS.sub('(...)', query)
+
+
+def _call_site():
+    """First frame outside the database package, as 'path:line in function'."""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_DATABASE_DIR) or 'contextlib' in filename:
+            continue
+        return f'{os.path.relpath(filename, _ROOT)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class _Timer:
+    __slots__ = ('stats', 'query', 'started')
+
+    def __init__(self, stats, query):
+        self.stats = stats
+        self.query = query
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.stats.record(self.query, time.perf_counter() - self.started)
+        return False
+
+
+class QueryStats:
+    """Per-statement timings, connection waits and queries per request.
+
+    Statements are grouped by their normalized shape. Queries slower than
+    `slow_ms` are logged with the line of app code that ran them. Scopes
+    (a request or socket event) count their queries; scopes running more
+    than `scope_warn` are logged as likely N+1 patterns.
+    """
+
+    def __init__(self, slow_ms=200, scope_warn=25):
+        self.slow_seconds = slow_ms / 1000 if slow_ms else None
+        self.scope_warn = scope_warn
+        self.queries = Histogram('booping_db_query_seconds',
+                                 'Time spent per statement, by normalized statement.',
+                                 LATENCY_BUCKETS, label='statement')
+        self.acquire = Histogram('booping_db_connection_acquire_seconds',
+                                 'Time to check a connection out of the pool.', LATENCY_BUCKETS)
+        self.per_scope = Histogram('booping_db_queries_per_scope',
+                                   'Queries run per request or socket event.',
+                                   SCOPE_BUCKETS, label='scope')
+        self.slow_queries = 0
+        self._scopes = {}      # greenlet -> [name, count, depth]
+        self._normalized = {}  # raw query -> normalized
+
+    def timed(self, query):
+        """Context manager that times one statement."""
+        return _Timer(self, query)
+
+    def record(self, query, elapsed):
+        statement = self._normalized.get(query)
+        if statement is None:
+            if len(self._normalized) > 5000:
+                self._normalized.clear()
+            statement = self._normalized[query] = normalize(query)
+        self.queries.observe(elapsed, statement)
+        scope = self._scopes.get(background.current_task())
+        if scope is not None:
+            scope[1] += 1
+        if self.slow_seconds and elapsed >= self.slow_seconds:
+            self.slow_queries += 1
+            print(f"Slow query ({elapsed * 1000:.1f} ms) at {_call_site()}: {statement[:300]}")
+
+    def record_acquire(self, waited):
+        self.acquire.observe(waited)
+
+    def begin_scope(self, name):
+        """Start counting queries for this greenlet (nested scopes count towards the outer one)."""
+        scope = self._scopes.get(background.current_task())
+        if scope is None:
+            self._scopes[background.current_task()] = [name, 0, 1]
+        else:
+            scope[2] += 1
+
+    def end_scope(self):
+        """Stop counting; returns the number of queries the scope ran."""
+        task = background.current_task()
+        scope = self._scopes.get(task)
+        if scope is None:
+            return 0
+        scope[2] -= 1
+        if scope[2]:
+            return scope[1]
+        del self._scopes[task]
+        name, count, _ = scope
+        self.per_scope.observe(count, name)
+        if self.scope_warn and count > self.scope_warn:
+            print(f"{name} ran {count} queries (possible N+1)")
+        return count
+
+    def scope_count(self):
+        """Queries run so far in the current scope (None outside one)."""
+        scope = self._scopes.get(background.current_task())
+        return scope[1] if scope else None
+
+    def collect(self):
+        return (self.queries.render() + self.acquire.render() + self.per_scope.render()
+                + gauge('booping_db_slow_queries_total', 'Statements slower than the slow-query threshold.',
+                        self.slow_queries, kind='counter'))
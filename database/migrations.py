@@ -0,0 +1,164 @@
+# Schema migrations for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Each migration runs once per database and is recorded in schema_version.
+# At startup a single query reads the current version; when it is up to
+# date nothing else touches the database. New databases are built from
+# schema.sql, which already contains every migration, and are stamped at
+# the latest version. On PostgreSQL an advisory lock stops workers that
+# start together from racing; on SQLite each migration claims its version
+# row inside its own transaction.
+
+from contextlib import contextmanager
+
+from database.db import (
+    USE_POSTGRES, ADDED_TABLES, ADDED_INDEXES,
+    get_db, query_db, transaction, init_db
+)
+
+# Key for pg_advisory_lock, shared by every worker of this app
+ADVISORY_LOCK_KEY = 0x626F6F70  # 'boop'
+
+SCHEMA_VERSION_TABLE = '''CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)'''
+
+_migrations = []
+
+
+def migration(version, description, postgres_only=False):
+    """Register func(tx) as a migration. Versions must increase; never renumber one."""
+    def register(func):
+        assert not _migrations or version > _migrations[-1][0], 'migration versions must increase'
+        _migrations.append((version, description, postgres_only, func))
+        return func
+    return register
+
+
+@migration(1, 'Add rate_limits, presence, user_stats, boop_pairs and the directory index')
+def _add_tables(tx):
+    for table in ADDED_TABLES.values():
+        tx.execute(table['create'])
+    for statement in ADDED_INDEXES:
+        tx.execute(statement)
+    # Backfill derived tables that were just added to an existing database
+    for name, table in ADDED_TABLES.items():
+        if table['rebuild'] and tx.execute(f'SELECT 1 FROM {name} LIMIT 1').fetchone() is None:
+            for statement in table['rebuild']:
+                tx.execute(statement)
+
+
+@migration(2, 'Allow 200-character display names', postgres_only=True)
+def _display_name_length(tx):
+    tx.execute('ALTER TABLE users DROP CONSTRAINT IF EXISTS users_display_name_check')
+    tx.execute('ALTER TABLE users ADD CONSTRAINT users_display_name_check CHECK (length(display_name) <= 200)')
+
+
+@migration(3, 'Seed and update badges', postgres_only=True)
+def _seed_badges(tx):
+    badge_data = [
+        ('First Boop', 'Sent your first boop!', 1, '🐾', None),
+        ('Booper', 'Sent 100 boops', 100, '🐾🐾', 'sparkle'),
+        ('Super Booper', 'Sent 200 boops', 200, '✨🐾', 'ghost'),
+        ('Boop Master', 'Sent 1,000 boops', 1000, '👑🐾', 'fire'),
+        ('Boop Legend', 'Sent 2,000 boops', 2000, '🌟👑🐾', 'rainbow'),
+        ('Generous Soul', 'Sent 4,000 boops', 4000, '💯', 'star'),
+        ('Boop Giver', 'Sent 10,000 boops', 10000, '🌟', 'heart'),
+        ('Boop Philanthropist', 'Sent 10,000 boops', 10000, '💖', 'galaxy'),
+        ('Spooky Booper', 'Sent 10,001 boops', 10001, '💀', 'skeleton'),
+        ('Extraterrestrial', 'Sent 12,000 boops', 12000, '👽', 'alien'),
+        ('Mechanical Mind', 'Sent 14,000 boops', 14000, '🤖', 'robot'),
+        ('Solar Flare', 'Sent 16,000 boops', 16000, '☀️', 'sun'),
+        ('Thunder Strike', 'Sent 18,000 boops', 18000, '⚡', 'lightning'),
+        ('Frozen Heart', 'Sent 20,001 boops', 20001, '❄️', 'snowflake'),
+    ]
+    tx.executemany('''
+        INSERT INTO badges (name, description, threshold, icon, unlocks_paw)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET
+            description = EXCLUDED.description,
+            threshold = EXCLUDED.threshold,
+            icon = EXCLUDED.icon,
+            unlocks_paw = EXCLUDED.unlocks_paw
+    ''', badge_data)
+
+
+def latest_version():
+    return _migrations[-1][0]
+
+
+def current_version():
+    """Highest applied migration (0 if none), or None before schema_version exists."""
+    try:
+        row = query_db('SELECT MAX(version) AS version FROM schema_version', one=True)
+    except Exception:
+        return None
+    return row['version'] or 0
+
+
+def _table_exists(name):
+    if USE_POSTGRES:
+        row = query_db('SELECT to_regclass(?) AS name', (name,), one=True)
+        return row['name'] is not None
+    return query_db("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,), one=True) is not None
+
+
+@contextmanager
+def _migration_lock():
+    """Hold the PostgreSQL advisory lock (and its connection) for the block."""
+    if not USE_POSTGRES:
+        yield
+        return
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT pg_advisory_lock(%s)', (ADVISORY_LOCK_KEY,))
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.rollback()
+            cur.execute('SELECT pg_advisory_unlock(%s)', (ADVISORY_LOCK_KEY,))
+            conn.commit()
+
+
+def _claim(tx, version, description):
+    """Record a migration as applied; False if another worker already did."""
+    cur = tx.execute(
+        'INSERT INTO schema_version (version, description) VALUES (?, ?) ON CONFLICT (version) DO NOTHING',
+        (version, description)
+    )
+    return cur.rowcount == 1
+
+
+def migrate():
+    """Create or upgrade the schema. Returns the descriptions of migrations applied."""
+    if current_version() == latest_version():
+        return []
+
+    applied = []
+    with _migration_lock():
+        fresh = not _table_exists('users')
+        if fresh:
+            init_db()
+        with transaction() as tx:
+            tx.execute(SCHEMA_VERSION_TABLE)
+            if fresh:
+                # schema.sql already includes every migration
+                for version, description, _, _ in _migrations:
+                    _claim(tx, version, description)
+                return applied
+
+        version = current_version()
+        for number, description, postgres_only, func in _migrations:
+            if number <= version:
+                continue
+            with transaction() as tx:
+                if not _claim(tx, number, description):
+                    continue
+                if USE_POSTGRES or not postgres_only:
+                    func(tx)
+            print(f"Migration {number} applied: {description}")
+            applied.append(description)
+    return applied
@@ -0,0 +1,210 @@
+# Connection pool for BOOPING App
+# Created by Claude Opus 4.5
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from services import background
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of reusable database connections.
+
+    Checkouts are keyed by the current greenlet (monkey-patched or not).
+    Nested checkouts from the same greenlet
+    reuse the connection it already holds, so helpers that call get_db()
+    from inside another get_db() block can never deadlock the pool. A full
+    pool parks each waiter on its own background.make_event(), so waiting
+    never blocks the hub the holders need to finish on.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=10.0, recycle_after=30.0,
+                 ping=None, reset=None, is_closed=None, on_checkout=None):
+        self._connect = connect
+        self._on_checkout = on_checkout
+        self._ping = ping
+        self._reset = reset
+        self._is_closed = is_closed or (lambda conn: False)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle_after = recycle_after
+
+        self._lock = threading.Lock()
+        self._waiters = deque()   # events of checkouts waiting for a connection
+        self._idle = []           # [(conn, returned_at)]
+        self._held = {}           # greenlet -> [conn, depth]
+        self._size = 0
+        self._pid = os.getpid()
+
+        # Stats
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the current greenlet."""
+        task = background.current_task()
+        held = self._held.get(task)
+        if held is not None:
+            held[1] += 1
+            try:
+                yield held[0]
+            finally:
+                held[1] -= 1
+            return
+
+        conn = self._acquire()
+        self._held[task] = [conn, 1]
+        broken = False
+        try:
+            yield conn
+        except BaseException:
+            broken = self._is_closed(conn)
+            raise
+        finally:
+            del self._held[task]
+            self._release(conn, broken)
+
+    def _acquire(self):
+        if os.getpid() != self._pid:
+            self._after_fork()
+
+        started = time.monotonic()
+        with self._lock:
+            self._checkouts += 1
+        while True:
+            with self._lock:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, returned_at = None, None
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s '
+                        f'(pool size {self.max_size})'
+                    )
+                waiter = background.make_event()
+                self._waiters.append(waiter)
+                self._waiting += 1
+            try:
+                waiter.wait(remaining)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+
+        with self._lock:
+            waited = time.monotonic() - started
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        if conn is not None and not self._healthy(conn, returned_at):
+            self._close(conn)
+            conn = None
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._notify()
+                raise
+            with self._lock:
+                self._created += 1
+        if self._on_checkout:
+            # Full acquisition time: waiting, health check and any reconnect
+            self._on_checkout(time.monotonic() - started)
+        return conn
+
+    def _healthy(self, conn, returned_at):
+        """Cheap liveness check; only pings connections that sat idle a while."""
+        if self._is_closed(conn):
+            return False
+        if self._ping and time.monotonic() - returned_at > self.recycle_after:
+            try:
+                self._ping(conn)
+            except Exception:
+                return False
+        return True
+
+    def _release(self, conn, broken=False):
+        if not broken and self._reset:
+            try:
+                self._reset(conn)
+            except Exception:
+                broken = True
+        if broken or self._is_closed(conn):
+            self._close(conn)
+            with self._lock:
+                self._size -= 1
+                self._discarded += 1
+                self._notify()
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._notify()
+
+    def _notify(self):
+        """Wake the longest waiting checkout (call with the lock held)."""
+        if self._waiters:
+            self._waiters.popleft().set()
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _after_fork(self):
+        """Drop connections inherited from a parent process."""
+        with self._lock:
+            self._idle = []
+            self._waiters = deque()
+            self._held = {}
+            self._size = 0
+            self._pid = os.getpid()
+
+    def close_all(self):
+        """Close every idle connection (used on shutdown)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Snapshot of pool usage for sizing decisions."""
+        with self._lock:
+            idle = len(self._idle)
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._size - idle,
+                'idle': idle,
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'avg_checkout_ms': round(self._wait_total / self._checkouts * 1000, 3)
+                if self._checkouts else 0.0,
+                'max_checkout_ms': round(self._wait_max * 1000, 3),
+            }
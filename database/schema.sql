@@ -20,6 +20,7 @@ CREATE TABLE IF NOT EXISTS users (
 
 CREATE INDEX IF NOT EXISTS idx_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_last_active ON users(last_active);
+CREATE INDEX IF NOT EXISTS idx_users_active_id ON users(last_active, id);
 
 -- Boops table
 CREATE TABLE IF NOT EXISTS boops (
@@ -36,6 +37,22 @@ CREATE INDEX IF NOT EXISTS idx_sender ON boops(sender_id);
 CREATE INDEX IF NOT EXISTS idx_recipient ON boops(recipient_id);
 CREATE INDEX IF NOT EXISTS idx_boop_created ON boops(created_at);
 
+-- Per-user boop counters, maintained alongside every boop insert
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id),
+    boops_sent INTEGER NOT NULL DEFAULT 0,
+    boops_received INTEGER NOT NULL DEFAULT 0
+);
+
+-- Directed boop counts per (sender, recipient), with a mutual flag for Boop Buddies
+CREATE TABLE IF NOT EXISTS boop_pairs (
+    sender_id INTEGER NOT NULL REFERENCES users(id),
+    recipient_id INTEGER NOT NULL REFERENCES users(id),
+    boop_count INTEGER NOT NULL DEFAULT 0,
+    is_mutual INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sender_id, recipient_id)
+);
+
 -- Favorites table
 CREATE TABLE IF NOT EXISTS favorites (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -71,6 +88,29 @@ CREATE TABLE IF NOT EXISTS user_badges (
 
 CREATE INDEX IF NOT EXISTS idx_user_badges_user ON user_badges(user_id);
 
+-- Rate limit windows (shared across workers when RATE_LIMIT_BACKEND=database)
+CREATE TABLE IF NOT EXISTS rate_limits (
+    bucket TEXT NOT NULL,
+    window_start INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, window_start)
+);
+
+-- Online users per worker (shared when SHARED_STATE_BACKEND=database)
+CREATE TABLE IF NOT EXISTS presence (
+    user_id INTEGER NOT NULL,
+    worker TEXT NOT NULL,
+    last_seen INTEGER NOT NULL,
+    PRIMARY KEY (user_id, worker)
+);
+
+-- Applied migrations (database/migrations.py); new databases are stamped at the latest
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Global stats (single row)
 CREATE TABLE IF NOT EXISTS global_stats (
     id INTEGER PRIMARY KEY CHECK (id = 1),
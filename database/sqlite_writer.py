@@ -0,0 +1,202 @@
+# SQLite writer for BOOPING App
+# Created by Claude Opus 4.5
+#
+# In WAL mode SQLite allows many readers but one writer. Rather than let
+# every request race for the write lock (and fail with "database is
+# locked"), all writes go through one connection owned by one background
+# task. Single-statement writes are queued and grouped: whatever is waiting
+# when the writer wakes up runs as one transaction, each write inside its
+# own savepoint so a failing one doesn't take the rest down with it.
+# Multi-statement transactions lease the writer connection instead.
+
+import os
+import time
+from contextlib import contextmanager
+
+from services import background
+
+
+class _Job:
+    __slots__ = ('func', 'args', 'done', 'result', 'error')
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.done = background.make_event()
+        self.result = None
+        self.error = None
+
+
+class _Lease:
+    __slots__ = ('granted', 'done')
+
+    def __init__(self):
+        self.granted = background.make_event()
+        self.done = background.make_event()
+
+
+class SQLiteWriter:
+    """Serializes every write through one connection and one background task.
+
+    `connect` opens the writer connection (autocommit; transactions are
+    explicit). `run` executes a blocking call (off the hub under eventlet).
+    """
+
+    def __init__(self, connect, run, batch_size=200, on_lease=None):
+        self._connect = connect
+        self._run_blocking = run
+        self._on_lease = on_lease
+        self.batch_size = batch_size
+        self._queue = None
+        self._pid = None
+        self._conn = None
+        self._holder = None       # greenlet holding the lease
+        self._lease_depth = 0
+
+        # Stats
+        self._jobs = 0
+        self._batches = 0
+        self._failed = 0
+        self._largest_batch = 0
+        self._leases = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._conn = None
+        self._queue = background.make_queue()
+        background.start_task(self._loop)
+
+    def submit(self, func, *args):
+        """Run func(conn, *args) on the writer connection; returns its result.
+
+        Called while holding the lease, it runs straight away (inside the
+        leased transaction).
+        """
+        if self.holds_lease():
+            return self._run_blocking(func, self._conn, *args)
+        self._ensure_started()
+        job = _Job(func, args)
+        self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def holds_lease(self):
+        return self._holder is not None and self._holder == background.current_task()
+
+    @property
+    def connection(self):
+        """The writer connection (only valid while holding the lease)."""
+        return self._conn
+
+    @contextmanager
+    def lease(self):
+        """Exclusive use of the writer connection, e.g. for a multi-statement transaction."""
+        if self.holds_lease():
+            self._lease_depth += 1
+            try:
+                yield self._conn
+            finally:
+                self._lease_depth -= 1
+            return
+
+        self._ensure_started()
+        started = time.monotonic()
+        lease = _Lease()
+        self._queue.put(lease)
+        lease.granted.wait()
+        if self._on_lease:
+            self._on_lease(time.monotonic() - started)
+        self._holder = background.current_task()
+        self._lease_depth = 1
+        try:
+            yield self._conn
+        finally:
+            self._holder = None
+            self._lease_depth = 0
+            lease.done.set()
+
+    def _loop(self):
+        pending = None
+        while True:
+            item = pending if pending is not None else self._queue.get()
+            pending = None
+            if self._conn is None:
+                try:
+                    self._conn = self._connect()
+                except Exception as e:
+                    print(f"SQLite writer could not connect: {e}")
+                    self._fail(item, e)
+                    background.sleep(1)
+                    continue
+
+            if isinstance(item, _Lease):
+                self._leases += 1
+                item.granted.set()
+                item.done.wait()
+                continue
+
+            # Group everything already queued (up to batch_size) into one transaction
+            batch = [item]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get()
+                if isinstance(item, _Lease):
+                    pending = item
+                    break
+                batch.append(item)
+
+            self._run_blocking(self._write_batch, batch)
+            self._jobs += len(batch)
+            self._batches += 1
+            self._largest_batch = max(self._largest_batch, len(batch))
+            for job in batch:
+                if job.error is not None:
+                    self._failed += 1
+                job.done.set()
+
+    def _write_batch(self, batch):
+        conn = self._conn
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for job in batch:
+                conn.execute('SAVEPOINT job')
+                try:
+                    job.result = job.func(conn, *job.args)
+                except Exception as e:
+                    job.error = e
+                    conn.execute('ROLLBACK TO job')
+                conn.execute('RELEASE job')
+            conn.execute('COMMIT')
+        except Exception as e:
+            print(f"SQLite write batch failed: {e}")
+            if conn.in_transaction:
+                try:
+                    conn.execute('ROLLBACK')
+                except Exception:
+                    pass
+            for job in batch:
+                if job.error is None:
+                    job.error = e
+
+    def _fail(self, item, error):
+        if isinstance(item, _Lease):
+            # The holder finds no connection and fails on first use
+            item.granted.set()
+            item.done.wait()
+        else:
+            item.error = error
+            item.done.set()
+
+    def stats(self):
+        """Writes, batches and leases handled by the writer."""
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'jobs': self._jobs,
+            'batches': self._batches,
+            'largest_batch': self._largest_batch,
+            'failed': self._failed,
+            'leases': self._leases,
+        }
@@ -0,0 +1,68 @@
+# Statement registry for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Hot-path queries are declared once at import time with statement(). Each
+# is translated for PostgreSQL once, says explicitly whether it returns the
+# new row id, and on PostgreSQL runs as a server-side prepared statement
+# (PREPARE once per pooled connection, then EXECUTE). SQLite runs the same
+# string every time, so sqlite3's statement cache skips re-parsing.
+
+import re
+
+_STRINGS_OR_PLACEHOLDERS = re.compile(r"('(?:[^']|'')*')|\?")
+
+_registry = {}
+
+
+def _number_placeholders(sql):
+    """Rewrite ? placeholders (outside string literals) to $1, $2, ...; returns (sql, count)."""
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(1):
+            return match.group(1)
+        count += 1
+        return f'${count}'
+
+    return _STRINGS_OR_PLACEHOLDERS.sub(replace, sql), count
+
+
+class Statement:
+    """One query, translated once per dialect.
+
+    `sql` uses SQLite's ? placeholders. `returning` names the column an
+    INSERT hands back (usually 'id'), or None for statements that return
+    nothing or select their own rows.
+    """
+
+    __slots__ = ('name', 'sql', 'returning', 'postgres_sql', 'prepare_sql', 'execute_sql')
+
+    def __init__(self, name, sql, returning=None):
+        self.name = name
+        self.sql = sql
+        self.returning = returning
+        suffix = f' RETURNING {returning}' if returning else ''
+        numbered, count = _number_placeholders(sql)
+        self.postgres_sql = _STRINGS_OR_PLACEHOLDERS.sub(
+            lambda m: m.group(1) or '%s', sql
+        ) + suffix
+        self.prepare_sql = f'PREPARE booping_{name} AS {numbered}{suffix}'
+        args = f" ({', '.join(['%s'] * count)})" if count else ''
+        self.execute_sql = f'EXECUTE booping_{name}{args}'
+
+    def __repr__(self):
+        return f'<Statement {self.name}>'
+
+
+def statement(name, sql, returning=None):
+    """Declare a statement (once, at import time)."""
+    if name in _registry:
+        raise ValueError(f'Statement {name!r} is already declared')
+    _registry[name] = Statement(name, sql, returning)
+    return _registry[name]
+
+
+def get_statements():
+    """All declared statements, by name."""
+    return dict(_registry)
@@ -0,0 +1,34 @@
+# Gunicorn settings for BOOPING App
+# Created by Claude Opus 4.5
+#
+# WEB_CONCURRENCY=1 (default) runs a single eventlet worker, as before.
+# With more workers, Socket.IO rooms are shared over SOCKETIO_MESSAGE_QUEUE
+# (the bundled local:// broker unless set); a local:// broker is started
+# here, before workers fork.
+
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+worker_class = 'eventlet'
+workers = Config.WEB_CONCURRENCY
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+_broker = None
+
+
+def on_starting(server):
+    global _broker
+    url = Config.SOCKETIO_MESSAGE_QUEUE or ''
+    if url.startswith('local://'):
+        _broker = subprocess.Popen([sys.executable, '-m', 'services.bus', url[len('local://'):]],
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def on_exit(server):
+    if _broker is not None:
+        _broker.terminate()
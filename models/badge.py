@@ -1,8 +1,18 @@
 # Badge model for BOOPING App
 # Created by Claude Opus 4.5
 
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
 from database.db import query_db, execute_db
+from database.statements import statement
 from models.boop import get_boop_count
+from services.cache import TTLCache
+from services.metrics import register_collector, labelled
+
+USER_BADGE_IDS = statement('user_badge_ids', 'SELECT badge_id FROM user_badges WHERE user_id = ?')
 
 # Starter paws everyone gets
 STARTER_PAWS = ['default', 'cat', 'sparkle', 'heart', 'moon']
@@ -29,6 +39,73 @@ ALL_PAWS = {
     'frog': {'emoji': '🐸', 'unlock': 'Exclusive'},
 }
 
+# Running sent counts kept for badge checks (reloaded from the DB after the
+# TTL so boops sent through other workers are picked up)
+PROGRESS_CACHE_SIZE = 10000
+PROGRESS_TTL_SECONDS = 300
+
+_catalog = None
+_progress = OrderedDict()   # user_id -> [sent_count, next_badge_index, loaded_at]
+_progress_lock = threading.Lock()
+
+# Bitset of paws each user has unlocked through badges (bits from the
+# catalog). Kept current by check_and_award_badges in this process; the TTL
+# picks up badges awarded by other workers.
+_paw_masks = TTLCache(PROGRESS_CACHE_SIZE, PROGRESS_TTL_SECONDS)
+
+register_collector(lambda: labelled(
+    'booping_paw_cache', 'Unlocked-paw bitset cache size and hit/miss counters.', _paw_masks.stats(), 'stat'
+))
+
+
+class BadgeCatalog:
+    """Read-only index of the badges table and the paws they unlock.
+
+    The table only changes through migrations, so it is loaded once per
+    process. Each paw in ALL_PAWS gets one bit; a user's unlocked paws are
+    an int with those bits set.
+    """
+
+    __slots__ = ('badges', 'by_id', 'paws', 'paw_bits', 'badge_paw_bits', 'starter_mask')
+
+    def __init__(self, rows):
+        badges = tuple(MappingProxyType(dict(row)) for row in sorted(rows, key=lambda b: b['threshold']))
+        paws = tuple(ALL_PAWS)
+        paw_bits = {name: 1 << index for index, name in enumerate(paws)}
+        starter_mask = 0
+        for name in STARTER_PAWS:
+            starter_mask |= paw_bits[name]
+        set_ = object.__setattr__
+        set_(self, 'badges', badges)
+        set_(self, 'by_id', MappingProxyType({b['id']: b for b in badges}))
+        set_(self, 'paws', paws)
+        set_(self, 'paw_bits', MappingProxyType(paw_bits))
+        set_(self, 'badge_paw_bits', MappingProxyType(
+            {b['id']: paw_bits[b['unlocks_paw']] for b in badges if b['unlocks_paw'] in paw_bits}
+        ))
+        set_(self, 'starter_mask', starter_mask)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('BadgeCatalog is read-only')
+
+    def mask_for(self, badge_ids):
+        """Paw bitset unlocked by these badges (starter paws included)."""
+        mask = self.starter_mask
+        for badge_id in badge_ids:
+            mask |= self.badge_paw_bits.get(badge_id, 0)
+        return mask
+
+    def paws_in(self, mask):
+        return [name for name in self.paws if mask & self.paw_bits[name]]
+
+
+def get_catalog():
+    """The badge catalog (loaded on first use)."""
+    global _catalog
+    if _catalog is None:
+        _catalog = BadgeCatalog(get_all_badges())
+    return _catalog
+
 
 def get_all_badges():
     """Get all available badges."""
@@ -47,63 +124,107 @@ def get_user_badges(user_id):
     )
 
 
-def get_unlocked_paws(user_id):
-    """Get paw styles unlocked by a user."""
-    paws = list(STARTER_PAWS)  # Everyone gets starter paws
-    badges = get_user_badges(user_id)
-    for badge in badges:
-        if badge['unlocks_paw'] and badge['unlocks_paw'] not in paws:
-            paws.append(badge['unlocks_paw'])
+def _load_badge_ids(user_id):
+    """Read a user's earned badge ids (and refresh their paw bitset)."""
+    badge_ids = {row['badge_id'] for row in query_db(USER_BADGE_IDS, (user_id,))}
+    _paw_masks.set(user_id, get_catalog().mask_for(badge_ids))
+    return badge_ids
+
 
+def get_unlocked_paw_mask(user_id, username):
+    """Bitset of the user's unlocked paws (no queries while cached)."""
+    catalog = get_catalog()
+    mask = _paw_masks.get(user_id)
+    if mask is None:
+        mask = catalog.mask_for(_load_badge_ids(user_id))
     # Exclusive frog paw for user 'frog'
-    from models.user import User
-    user = User.get_by_id(user_id)
-    if user and user.username == 'frog':
-        paws.append('frog')
+    if username == 'frog':
+        mask |= catalog.paw_bits['frog']
+    return mask
+
 
-    return paws
+def get_unlocked_paws(user_id, username):
+    """Get paw styles unlocked by a user."""
+    return get_catalog().paws_in(get_unlocked_paw_mask(user_id, username))
 
 
-def get_all_paws_with_status(user_id):
+def get_all_paws_with_status(user_id, username):
     """Get all paws with their unlock status for a user."""
-    unlocked = get_unlocked_paws(user_id)
+    catalog = get_catalog()
+    mask = get_unlocked_paw_mask(user_id, username)
     result = []
     for paw_name, paw_info in ALL_PAWS.items():
+        unlocked = bool(mask & catalog.paw_bits[paw_name])
         result.append({
             'name': paw_name,
             'emoji': paw_info['emoji'],
-            'unlocked': paw_name in unlocked,
-            'unlock_hint': paw_info['unlock'] if paw_name not in unlocked else None
+            'unlocked': unlocked,
+            'unlock_hint': None if unlocked else paw_info['unlock']
         })
     return result
 
 
-def check_and_award_badges(user_id):
-    """Check if user has earned any new badges and award them."""
-    boop_count = get_boop_count(user_id, 'sent')
-
-    # Get badges user is eligible for but hasn't earned
-    eligible = query_db(
-        '''SELECT b.* FROM badges b
-           WHERE b.threshold <= ?
-           AND NOT EXISTS (
-               SELECT 1 FROM user_badges ub
-               WHERE ub.user_id = ? AND ub.badge_id = b.id
-           )''',
-        (boop_count, user_id)
-    )
-
-    newly_earned = []
-    for badge in eligible:
+def _load_progress(user_id):
+    """Read a user's sent count and earned badges from the database.
+
+    Returns (sent_count, earned_badge_ids).
+    """
+    count = get_boop_count(user_id, 'sent')
+    return count, _load_badge_ids(user_id)
+
+
+def check_and_award_badges(user_id, increment=1):
+    """Check if user has earned any new badges and award them.
+
+    `increment` is the number of boops just sent. Sent counts are tracked in
+    memory, so the common case (no threshold crossed) needs no queries.
+    """
+    catalog = get_catalog()
+    thresholds = catalog.badges
+    now = time.monotonic()
+
+    with _progress_lock:
+        progress = _progress.get(user_id)
+        if progress is not None and now - progress[2] > PROGRESS_TTL_SECONDS:
+            progress = None
+        if progress is not None:
+            _progress.move_to_end(user_id)
+            progress[0] += increment
+            if progress[1] >= len(thresholds) or progress[0] < thresholds[progress[1]]['threshold']:
+                return []
+
+    if progress is None:
+        # Cache miss: the DB count already includes the boops just sent.
+        # Anything eligible but missing is awarded (e.g. newly added badges).
+        count, earned_ids = _load_progress(user_id)
+        earned = [b for b in thresholds if b['threshold'] <= count and b['id'] not in earned_ids]
+        next_index = sum(1 for b in thresholds if b['threshold'] <= count)
+        with _progress_lock:
+            _progress[user_id] = [count, next_index, now]
+            while len(_progress) > PROGRESS_CACHE_SIZE:
+                _progress.popitem(last=False)
+    else:
+        with _progress_lock:
+            earned = []
+            while progress[1] < len(thresholds) and thresholds[progress[1]]['threshold'] <= progress[0]:
+                earned.append(thresholds[progress[1]])
+                progress[1] += 1
+
+    if earned:
+        # One multi-row insert; ignore badges another worker already awarded
+        values = ', '.join('(?, ?)' for _ in earned)
+        args = [arg for badge in earned for arg in (user_id, badge['id'])]
         execute_db(
-            'INSERT INTO user_badges (user_id, badge_id) VALUES (?, ?)',
-            (user_id, badge['id'])
+            f'INSERT INTO user_badges (user_id, badge_id) VALUES {values} ON CONFLICT DO NOTHING',
+            args
         )
-        newly_earned.append({
-            'name': badge['name'],
-            'description': badge['description'],
-            'icon': badge['icon'],
-            'unlocks_paw': badge['unlocks_paw']
-        })
-
-    return newly_earned
+        mask = _paw_masks.get(user_id)
+        if mask is not None:
+            _paw_masks.set(user_id, mask | catalog.mask_for(badge['id'] for badge in earned))
+
+    return [{
+        'name': badge['name'],
+        'description': badge['description'],
+        'icon': badge['icon'],
+        'unlocks_paw': badge['unlocks_paw']
+    } for badge in earned]
@@ -1,22 +1,55 @@
 # Boop model for BOOPING App
 # Created by Claude Opus 4.5
 
-from database.db import query_db, execute_db, USE_POSTGRES
+from database.db import query_db, transaction, rebuild_derived_table, USE_POSTGRES
+from database.statements import statement
 from datetime import datetime
+from services import boop_writer
+from services.counters import get_counters
+
+INSERT_BOOP = statement(
+    'insert_boop',
+    'INSERT INTO boops (sender_id, recipient_id, paw_style) VALUES (?, ?, ?)',
+    returning='id'
+)
+BOOPS_SENT = statement('boops_sent', 'SELECT boops_sent AS count FROM user_stats WHERE user_id = ?')
+BOOPS_RECEIVED = statement('boops_received', 'SELECT boops_received AS count FROM user_stats WHERE user_id = ?')
 
 
 def create_boop(sender_id, recipient_id, paw_style='default'):
-    """Create a new boop."""
-    boop_id = execute_db(
-        '''INSERT INTO boops (sender_id, recipient_id, paw_style)
-           VALUES (?, ?, ?)''',
-        (sender_id, recipient_id, paw_style)
-    )
-    # Update global boop counter
-    execute_db('UPDATE global_stats SET total_boops = total_boops + 1, last_updated = CURRENT_TIMESTAMP')
+    """Create a new boop.
+
+    In buffered mode the boop is queued for the background writer and no id
+    is returned. If the queue is full it is written immediately instead.
+    """
+    if boop_writer.is_buffered() and boop_writer.get_buffer().add(sender_id, recipient_id, paw_style):
+        return None
+
+    with transaction() as tx:
+        boop_id = tx.insert(INSERT_BOOP, (sender_id, recipient_id, paw_style))
+        boop_writer.update_boop_aggregates(tx, [(sender_id, recipient_id)])
+    # Update global boop counter (folded into global_stats in the background)
+    get_counters().add('total_boops')
     return boop_id
 
 
+def create_boops(sender_id, recipient_id, paw_style='default', count=1):
+    """Create `count` boops from one sender to one recipient at once.
+
+    One transaction with a single multi-row insert and one counter bump per
+    table (queued together in buffered mode). Returns nothing; ids are not
+    needed by the batched path.
+    """
+    if boop_writer.is_buffered() and boop_writer.get_buffer().add(sender_id, recipient_id, paw_style, count):
+        return
+
+    with transaction() as tx:
+        tx.insert_many('boops', ('sender_id', 'recipient_id', 'paw_style'),
+                       [(sender_id, recipient_id, paw_style)] * count)
+        boop_writer.update_boop_aggregates(tx, [(sender_id, recipient_id)] * count)
+    get_counters().add('total_boops', count)
+
+
 def get_boops_sent(user_id, limit=50):
     """Get boops sent by a user."""
     return query_db(
@@ -71,53 +104,38 @@ def get_new_boops_since(user_id, since_timestamp):
 
 
 def get_boop_count(user_id, direction='sent'):
-    """Get boop count for a user."""
-    if direction == 'sent':
-        result = query_db(
-            'SELECT COUNT(*) as count FROM boops WHERE sender_id = ?',
-            (user_id,), one=True
-        )
-    else:
-        result = query_db(
-            'SELECT COUNT(*) as count FROM boops WHERE recipient_id = ?',
-            (user_id,), one=True
-        )
-    return result['count'] if result else 0
+    """Get boop count for a user (from the user_stats counters)."""
+    result = query_db(BOOPS_SENT if direction == 'sent' else BOOPS_RECEIVED, (user_id,), one=True)
+    count = result['count'] if result else 0
+    return count + boop_writer.pending_count(user_id, direction)
+
+
+def rebuild_user_stats():
+    """Recompute every user's sent/received counters from the boops table."""
+    if boop_writer.is_buffered():
+        boop_writer.get_buffer().flush()
+    rebuild_derived_table('user_stats')
 
 
 def get_mutual_boops(user_id):
     """Get users who have mutual boops with the given user."""
     return query_db(
-        '''SELECT DISTINCT u.id, u.display_name, u.color_theme, u.paw_style
-           FROM boops b1
-           JOIN boops b2 ON b1.sender_id = b2.recipient_id
-                        AND b1.recipient_id = b2.sender_id
-           JOIN users u ON u.id = b1.recipient_id
-           WHERE b1.sender_id = ?''',
+        '''SELECT u.id, u.username, u.display_name, u.color_theme, u.paw_style, u.last_active
+           FROM boop_pairs p
+           JOIN users u ON u.id = p.recipient_id
+           WHERE p.sender_id = ? AND p.is_mutual = 1''',
         (user_id,)
     )
 
 
+def rebuild_boop_pairs():
+    """Recompute the boop_pairs table (Boop Buddies) from the boops table."""
+    if boop_writer.is_buffered():
+        boop_writer.get_buffer().flush()
+    rebuild_derived_table('boop_pairs')
+
+
 def get_global_stats():
-    """Get global boop statistics."""
-    result = query_db('SELECT * FROM global_stats WHERE id = 1', one=True)
-    if result:
-        return {
-            'total_boops': result['total_boops'],
-            'total_users': result['total_users'],
-            'last_updated': result['last_updated']
-        }
-    return {'total_boops': 0, 'total_users': 0, 'last_updated': None}
-
-
-def get_user_boops_last_minute(user_id):
-    """Count boops sent by user in the last minute (for rate limiting)."""
-    if USE_POSTGRES:
-        time_filter = "NOW() - INTERVAL '1 minute'"
-    else:
-        time_filter = "datetime('now', '-1 minute')"
-    result = query_db(
-        f'SELECT COUNT(*) as count FROM boops WHERE sender_id = ? AND created_at > {time_filter}',
-        (user_id,), one=True
-    )
-    return result['count'] if result else 0
+    """Get global boop statistics (cached, includes unflushed increments)."""
+    return get_counters().read()
+
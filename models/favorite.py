@@ -2,6 +2,9 @@
 # Created by Claude Opus 4.5
 
 from database.db import query_db, execute_db
+from database.statements import statement
+
+FAVORITE_IDS = statement('favorite_ids', 'SELECT favorite_user_id FROM favorites WHERE user_id = ?')
 
 
 def add_favorite(user_id, favorite_user_id):
@@ -41,10 +44,7 @@ def get_favorites(user_id):
 
 def get_favorite_ids(user_id):
     """Get just the IDs of favorited users (for quick lookup)."""
-    rows = query_db(
-        'SELECT favorite_user_id FROM favorites WHERE user_id = ?',
-        (user_id,)
-    )
+    rows = query_db(FAVORITE_IDS, (user_id,))
     return [row['favorite_user_id'] for row in rows]
 
 
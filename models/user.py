@@ -1,9 +1,57 @@
 # User model for BOOPING App
 # Created by Claude Opus 4.5
 
+import base64
+import json
+
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from database.db import query_db, execute_db
+from config import Config
+from database.db import query_db, execute_db, USE_POSTGRES
+from database.statements import statement
+from services.activity import get_tracker
+from services.cache import TTLCache
+from services.counters import get_counters
+from services.metrics import register_collector, labelled
+from services.passwords import get_hasher
+
+# Recently loaded user rows, keyed by id. Serves the Flask-Login user loader
+# and recipient checks; invalidated whenever this process updates a user.
+_user_cache = TTLCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL_SECONDS)
+
+register_collector(lambda: labelled(
+    'booping_user_cache', 'User row cache size and hit/miss counters.', _user_cache.stats(), 'stat'
+))
+
+USER_COLUMNS = ('id, username, password_hash, display_name, tagline, color_theme, paw_style, '
+                'created_at, last_active, last_login')
+USER_BY_ID = statement('user_by_id', f'SELECT {USER_COLUMNS} FROM users WHERE id = ?')
+USER_BY_USERNAME = statement('user_by_username', f'SELECT {USER_COLUMNS} FROM users WHERE username = ?')
+INSERT_USER = statement(
+    'insert_user',
+    'INSERT INTO users (username, password_hash, display_name) VALUES (?, ?, ?)',
+    returning='id'
+)
+UPDATE_PASSWORD_HASH = statement('update_password_hash', 'UPDATE users SET password_hash = ? WHERE id = ?')
+
+# Columns the user directory needs (never password_hash)
+DIRECTORY_COLUMNS = 'id, username, display_name, tagline, color_theme, paw_style, last_active'
+
+# Directory activity filters, in minutes (match the frontend's activity glows)
+ACTIVITY_FILTERS = {'5m': 5, '1h': 60}
+
+
+def _encode_cursor(row):
+    raw = json.dumps([str(row['last_active']), row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """Decode a directory cursor into (last_active, id). Raises ValueError."""
+    try:
+        last_active, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return last_active, int(user_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
 
 
 class User(UserMixin):
@@ -41,14 +89,34 @@ class User(UserMixin):
 
     @staticmethod
     def get_by_id(user_id):
-        """Get a user by ID."""
-        row = query_db('SELECT * FROM users WHERE id = ?', (user_id,), one=True)
+        """Get a user by ID (served from the user cache when possible)."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        row = _user_cache.get(user_id)
+        if row is None:
+            row = query_db(USER_BY_ID, (user_id,), one=True)
+            if row is None:
+                return None
+            row = dict(row)
+            _user_cache.set(user_id, row)
+        # Activity timestamps may be newer in memory than in the row
+        row = dict(row)
+        tracker = get_tracker()
+        tracker.overlay(row, 'last_active')
+        tracker.overlay(row, 'last_login')
         return User.from_row(row)
 
+    @staticmethod
+    def invalidate_cache(user_id):
+        """Drop a user from the cache after their row changes."""
+        _user_cache.invalidate(int(user_id))
+
     @staticmethod
     def get_by_username(username):
         """Get a user by username."""
-        row = query_db('SELECT * FROM users WHERE username = ?', (username,), one=True)
+        row = query_db(USER_BY_USERNAME, (username,), one=True)
         return User.from_row(row)
 
     @staticmethod
@@ -70,32 +138,67 @@ class User(UserMixin):
     @staticmethod
     def create(username, password, display_name):
         """Create a new user."""
-        password_hash = generate_password_hash(password)
+        password_hash = get_hasher().hash(password)
         display_name = User._sanitize_display_name(display_name)
-        user_id = execute_db(
-            '''INSERT INTO users (username, password_hash, display_name)
-               VALUES (?, ?, ?)''',
-            (username, password_hash, display_name)
-        )
+        user_id = execute_db(INSERT_USER, (username, password_hash, display_name))
         # Update global user count
-        execute_db('UPDATE global_stats SET total_users = total_users + 1')
+        get_counters().add('total_users')
         return User.get_by_id(user_id)
 
     @staticmethod
-    def get_all(exclude_user_id=None):
-        """Get all users, optionally excluding one."""
+    def get_directory(exclude_user_id=None, limit=50, cursor=None, active=None):
+        """Get one page of users, most recently active first.
+
+        Uses keyset pagination on (last_active, id): pass the returned cursor
+        back to get the next page. `active` is a key of ACTIVITY_FILTERS.
+        Returns (users as dicts, next_cursor or None).
+        """
+        conditions = []
+        args = []
         if exclude_user_id:
-            rows = query_db(
-                'SELECT * FROM users WHERE id != ? ORDER BY last_active DESC',
-                (exclude_user_id,)
-            )
-        else:
-            rows = query_db('SELECT * FROM users ORDER BY last_active DESC')
-        return [User.from_row(row) for row in rows]
+            conditions.append('id != ?')
+            args.append(exclude_user_id)
+        if active:
+            minutes = ACTIVITY_FILTERS[active]
+            if USE_POSTGRES:
+                conditions.append(f"last_active > NOW() - INTERVAL '{minutes} minutes'")
+            else:
+                conditions.append(f"last_active > datetime('now', '-{minutes} minutes')")
+        if cursor:
+            last_active, last_id = _decode_cursor(cursor)
+            conditions.append('(last_active < ? OR (last_active = ? AND id < ?))')
+            args.extend([last_active, last_active, last_id])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = query_db(
+            f'''SELECT {DIRECTORY_COLUMNS} FROM users
+                {where}
+                ORDER BY last_active DESC, id DESC
+                LIMIT ?''',
+            (*args, limit + 1)
+        )
+        next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        # Show activity not flushed to the database yet, but keep the database
+        # order: re-sorting on the overlay would skip or repeat users across pages
+        tracker = get_tracker()
+        users = [tracker.overlay(dict(row)) for row in rows[:limit]]
+        return users, next_cursor
 
     def check_password(self, password):
-        """Verify password."""
-        return check_password_hash(self.password_hash, password)
+        """Verify password (off the event loop).
+
+        A correct password hashed with old parameters is rehashed with the
+        current PASSWORD_HASH_METHOD.
+        """
+        hasher = get_hasher()
+        if not hasher.verify(self.password_hash, password):
+            return False
+        if hasher.needs_rehash(self.password_hash):
+            self.password_hash = hasher.hash(password)
+            execute_db(UPDATE_PASSWORD_HASH, (self.password_hash, self.id))
+            User.invalidate_cache(self.id)
+            hasher.record_rehash()
+        return True
 
     def update_profile(self, display_name=None, tagline=None, color_theme=None, paw_style=None):
         """Update user profile."""
@@ -113,20 +216,24 @@ class User(UserMixin):
                WHERE id = ?''',
             (self.display_name, self.tagline, self.color_theme, self.paw_style, self.id)
         )
+        User.invalidate_cache(self.id)
 
     def update_last_active(self):
-        """Update last active timestamp."""
-        execute_db(
-            'UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE id = ?',
-            (self.id,)
-        )
+        """Update last active timestamp (written to the database in bulk)."""
+        tracker = get_tracker()
+        tracker.touch(self.id, 'last_active')
+        self.last_active = tracker.get(self.id, 'last_active')
 
     def update_last_login(self):
         """Update last login timestamp (for tracking new boops)."""
-        execute_db(
-            'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?',
-            (self.id,)
-        )
+        tracker = get_tracker()
+        tracker.touch(self.id, 'last_login')
+        self.last_login = tracker.get(self.id, 'last_login')
+
+    @staticmethod
+    def get_cache_stats():
+        """Get user cache size and hit/miss counters."""
+        return _user_cache.stats()
 
     def to_dict(self):
         """Convert to dictionary for JSON responses."""
@@ -3,10 +3,15 @@
 
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from models.user import User
+from config import Config
+from database.db import get_db
+from models.user import User, ACTIVITY_FILTERS
 from models.boop import create_boop, get_boop_count, get_boops_received, get_global_stats, get_new_boops_since, get_mutual_boops
 from models.badge import check_and_award_badges, get_user_badges, get_unlocked_paws, get_all_paws_with_status
 from models.favorite import add_favorite, remove_favorite, get_favorites, get_favorite_ids
+from services.activity import get_tracker
+from services.presence import get_registry
+from services.rate_limit import allow_boops
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -14,9 +19,68 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 @api_bp.route('/users')
 @login_required
 def get_users():
-    """Get all users except current user."""
-    users = User.get_all(exclude_user_id=current_user.id)
-    return jsonify([u.to_dict() for u in users])
+    """Get a page of the user directory (everyone except current user).
+
+    Query params: limit, cursor (from the previous page), active ('5m' or '1h').
+    """
+    limit = min(request.args.get('limit', Config.USER_DIRECTORY_PAGE_SIZE, type=int),
+                Config.USER_DIRECTORY_MAX_PAGE_SIZE)
+    active = request.args.get('active')
+    if active and active not in ACTIVITY_FILTERS:
+        return jsonify({'error': f"active must be one of {', '.join(ACTIVITY_FILTERS)}"}), 400
+    try:
+        users, next_cursor = User.get_directory(
+            exclude_user_id=current_user.id,
+            limit=max(limit, 1),
+            cursor=request.args.get('cursor'),
+            active=active
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'users': users, 'next_cursor': next_cursor})
+
+
+@api_bp.route('/bootstrap')
+@login_required
+def bootstrap():
+    """Get everything the homepage needs on load in one request.
+
+    Each user row appears once in `users` (keyed by id); the favorites,
+    buddies and everyone sections list user ids.
+    """
+    user_id = current_user.id
+    # Hold one pooled connection for every query below
+    tracker = get_tracker()
+    with get_db():
+        favorites = [tracker.overlay(dict(f)) for f in get_favorites(user_id)]
+        buddies = [tracker.overlay(dict(m)) for m in get_mutual_boops(user_id)]
+        directory, next_cursor = User.get_directory(
+            exclude_user_id=user_id, limit=Config.USER_DIRECTORY_PAGE_SIZE
+        )
+        new_boops = [dict(b) for b in get_new_boops_since(user_id, current_user.last_login)]
+        my_stats = {
+            'boops_sent': get_boop_count(user_id, 'sent'),
+            'boops_received': get_boop_count(user_id, 'received')
+        }
+        global_stats = get_global_stats()
+
+    users = {}
+    for row in directory + buddies + favorites:
+        users.setdefault(str(row['id']), {}).update(row)
+    favorite_ids = [f['id'] for f in favorites]
+    listed = set(favorite_ids) | {b['id'] for b in buddies}
+
+    return jsonify({
+        'users': users,
+        'favorites': favorite_ids,
+        'buddies': [b['id'] for b in buddies],
+        'everyone': [u['id'] for u in directory if u['id'] not in listed],
+        'next_cursor': next_cursor,
+        'favorite_ids': favorite_ids,
+        'my_stats': my_stats,
+        'global_stats': global_stats,
+        'new_boops': new_boops
+    })
 
 
 @api_bp.route('/users/me')
@@ -72,7 +136,7 @@ def get_my_badges():
 @login_required
 def get_my_paws():
     """Get paw styles unlocked by current user."""
-    paws = get_unlocked_paws(current_user.id)
+    paws = get_unlocked_paws(current_user.id, current_user.username)
     return jsonify(paws)
 
 
@@ -80,7 +144,7 @@ def get_my_paws():
 @login_required
 def get_all_paws():
     """Get all paw styles with unlock status."""
-    paws = get_all_paws_with_status(current_user.id)
+    paws = get_all_paws_with_status(current_user.id, current_user.username)
     return jsonify(paws)
 
 
@@ -115,6 +179,11 @@ def send_boop():
     recipient = User.get_by_id(recipient_id)
     if not recipient:
         return jsonify({'error': 'User not found'}), 404
+    recipient_id = recipient.id  # the client may send the id as a string
+
+    # Rate limiting check (same budget as the socket path)
+    if not allow_boops(current_user.id):
+        return jsonify({'error': 'Slow down! Too many boops.'}), 429
 
     # Create the boop
     boop_id = create_boop(current_user.id, recipient_id, paw_style)
@@ -143,13 +212,21 @@ def get_stats():
     return jsonify(get_global_stats())
 
 
+@api_bp.route('/presence')
+@login_required
+def get_presence():
+    """Get the ids of users connected right now."""
+    return jsonify({'online': sorted(get_registry().online_ids())})
+
+
 # Favorites endpoints
 @api_bp.route('/users/me/favorites')
 @login_required
 def get_my_favorites():
     """Get current user's favorite users."""
     favorites = get_favorites(current_user.id)
-    return jsonify([dict(f) for f in favorites])
+    tracker = get_tracker()
+    return jsonify([tracker.overlay(dict(f)) for f in favorites])
 
 
 @api_bp.route('/users/me/favorite-ids')
@@ -183,4 +260,5 @@ def remove_user_favorite(user_id):
 def get_my_mutuals():
     """Get users with mutual boops (you booped them, they booped you)."""
     mutuals = get_mutual_boops(current_user.id)
-    return jsonify([dict(m) for m in mutuals])
+    tracker = get_tracker()
+    return jsonify([tracker.overlay(dict(m)) for m in mutuals])
@@ -4,10 +4,16 @@
 from flask import Blueprint, render_template, redirect, url_for, request, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from models.user import User
+from services.passwords import get_hasher, LoginBusy
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def _busy():
+    flash('Lots of boopers are logging in right now. Try again in a moment!', 'error')
+    return render_template('index.html'), 503, {'Retry-After': '5'}
+
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -18,7 +24,12 @@ def login():
         password = request.form.get('password', '')
 
         user = User.get_by_username(username)
-        if user and user.check_password(password):
+        try:
+            with get_hasher().admit():
+                valid = user is not None and user.check_password(password)
+        except LoginBusy:
+            return _busy()
+        if valid:
             login_user(user)
             user.update_last_active()
             return redirect(url_for('main.home'))
@@ -61,7 +72,11 @@ def register():
         return redirect(url_for('auth.login'))
 
     # Create user
-    user = User.create(username, password, display_name)
+    try:
+        with get_hasher().admit():
+            user = User.create(username, password, display_name)
+    except LoginBusy:
+        return _busy()
     login_user(user)
     flash('Welcome to BOOPING!', 'success')
     return redirect(url_for('main.home'))
@@ -0,0 +1,20 @@
+# Metrics routes for BOOPING App
+# Created by Claude Opus 4.5
+
+import hmac
+
+from flask import Blueprint, Response, abort, request
+from config import Config
+from services.metrics import render
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus metrics (registered when METRICS_ENABLED is set)."""
+    if Config.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {Config.METRICS_TOKEN}'):
+            abort(401)
+    return Response(render(), mimetype='text/plain; version=0.0.4')
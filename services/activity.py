@@ -0,0 +1,115 @@
+# Activity timestamp coalescing for BOOPING App
+# Created by Claude Opus 4.5
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import Config
+from database.db import transaction, USE_POSTGRES
+from services.background import PeriodicWorker
+
+ACTIVITY_FIELDS = ('last_active', 'last_login')
+
+# Forget in-memory timestamps this long after they were flushed
+RETENTION_SECONDS = 3600
+
+
+def _now():
+    """Current UTC time in the form the database returns it."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    return now if USE_POSTGRES else now.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class ActivityTracker:
+    """Coalesces users.last_active / last_login writes.
+
+    Timestamps are recorded in memory and written with one multi-row UPDATE
+    per column every `flush_interval` seconds. A touch less than
+    `granularity` seconds after the last written value is deferred: the
+    latest value is written once the granularity has passed (or at exit).
+    Readers overlay the in-memory values, so they stay fresh between
+    flushes.
+    """
+
+    def __init__(self, flush_interval, granularity):
+        self.granularity = granularity
+        self._latest = {}    # (user_id, field) -> (value, epoch)
+        self._written = {}   # (user_id, field) -> epoch of last written value
+        self._dirty = set()
+        self._deferred = {}  # (user_id, field) -> epoch after which it is due
+        self._lock = threading.Lock()
+        self._worker = PeriodicWorker('activity-writer', flush_interval, self.flush)
+
+    def touch(self, user_id, field='last_active'):
+        """Record that a user was active (or marked boops seen) just now."""
+        key = (user_id, field)
+        now = time.time()
+        with self._lock:
+            self._latest[key] = (_now(), now)
+            due = self._written.get(key, 0) + self.granularity
+            if now >= due:
+                self._dirty.add(key)
+                self._deferred.pop(key, None)
+            elif key not in self._dirty:
+                self._deferred[key] = due
+        self._worker.start()
+
+    def get(self, user_id, field='last_active'):
+        """Freshest known timestamp for a user, or None if none in memory."""
+        entry = self._latest.get((user_id, field))
+        return entry[0] if entry else None
+
+    def overlay(self, row, field='last_active'):
+        """Update a user dict (with 'id') in place with in-memory timestamps."""
+        value = self.get(row['id'], field)
+        if value is not None and (row.get(field) is None or value > row[field]):
+            row[field] = value
+        return row
+
+    def flush(self):
+        """Write pending timestamps, one UPDATE per column."""
+        now = time.time()
+        final = self._worker.stopped
+        with self._lock:
+            for key, due in list(self._deferred.items()):
+                if final or now >= due:
+                    self._dirty.add(key)
+                    del self._deferred[key]
+            dirty, self._dirty = self._dirty, set()
+            pending = [(key, self._latest[key]) for key in dirty]
+        if not pending:
+            return
+        try:
+            with transaction() as tx:
+                for field in ACTIVITY_FIELDS:
+                    rows = [(user_id, value) for (user_id, f), (value, _) in pending if f == field]
+                    if rows:
+                        tx.update_many('users', field, rows, cast='timestamp')
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty
+            raise
+
+        cutoff = time.time() - RETENTION_SECONDS
+        with self._lock:
+            for key, (_, epoch) in pending:
+                self._written[key] = max(self._written.get(key, 0), epoch)
+            for key in [k for k, (_, epoch) in self._latest.items()
+                        if epoch < cutoff and k not in self._dirty and k not in self._deferred]:
+                del self._latest[key]
+                self._written.pop(key, None)
+
+
+_tracker = None
+
+
+def get_tracker():
+    """Get the process-wide activity tracker."""
+    global _tracker
+    if _tracker is None:
+        _tracker = ActivityTracker(
+            flush_interval=Config.ACTIVITY_FLUSH_SECONDS,
+            granularity=Config.ACTIVITY_GRANULARITY_SECONDS
+        )
+    return _tracker
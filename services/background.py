@@ -0,0 +1,155 @@
+# Background workers for BOOPING App
+# Created by Claude Opus 4.5
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+try:
+    from greenlet import getcurrent as _current_greenlet
+except ImportError:
+    _current_greenlet = None
+
+# Async primitives. Plain threads by default (CLI, scripts); create_app()
+# swaps in the Socket.IO server's so workers run as green threads under eventlet.
+_start_task = None
+_sleep = time.sleep
+_make_event = threading.Event
+_make_queue = queue.Queue
+_queue_empty = queue.Empty
+_async_mode = 'threading'
+
+
+def configure(socketio):
+    """Run background workers on the Socket.IO server's async mode."""
+    global _start_task, _sleep, _make_event, _make_queue, _queue_empty, _async_mode
+    _start_task = socketio.start_background_task
+    _sleep = socketio.sleep
+    _make_event = socketio.server.eio.create_event
+    _make_queue = socketio.server.eio.create_queue
+    _queue_empty = socketio.server.eio.get_queue_empty_exception()
+    _async_mode = socketio.server.eio.async_mode
+
+
+def async_mode():
+    """'eventlet' when background tasks run as green threads on the hub."""
+    return _async_mode
+
+
+def make_event():
+    """Event that waits without blocking other green threads."""
+    return _make_event()
+
+
+def make_queue():
+    """Queue whose get() waits without blocking other green threads."""
+    return _make_queue()
+
+
+class Semaphore:
+    """Counting semaphore whose acquire() waits without blocking other green threads."""
+
+    def __init__(self, value):
+        self._tokens = make_queue()
+        self._empty = _queue_empty
+        for _ in range(value):
+            self._tokens.put(None)
+
+    def acquire(self, timeout=None):
+        """Take a slot; False if none frees up within `timeout` seconds."""
+        try:
+            self._tokens.get(timeout=timeout)
+        except self._empty:
+            return False
+        return True
+
+    def release(self):
+        self._tokens.put(None)
+
+
+def current_task():
+    """Identity of the running green thread (or OS thread without greenlet).
+
+    Unlike threading.get_ident(), this tells greenlets apart even when the
+    threading module hasn't been monkey-patched (dev server, flask CLI).
+    """
+    if _current_greenlet is not None:
+        return _current_greenlet()
+    return threading.get_ident()
+
+
+def sleep(seconds):
+    """Sleep without blocking other green threads."""
+    _sleep(seconds)
+
+
+def start_task(target, *args, **kwargs):
+    """Start a background task (green thread under eventlet)."""
+    if _start_task is not None:
+        return _start_task(target, *args, **kwargs)
+    thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+class PeriodicWorker:
+    """Call `func` every `interval` seconds in the background.
+
+    wake() triggers the next pass early. A final pass runs at interpreter
+    exit so nothing buffered in memory is left behind.
+    """
+
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self._pid = None
+        self._event = None
+        self._stopped = False
+        self._run_lock = threading.Lock()
+        self._exit_registered = False
+
+    def start(self):
+        """Start the worker once per process (safe to call repeatedly)."""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stopped = False
+        self._event = _make_event()
+        start_task(self._loop)
+        if not self._exit_registered:
+            atexit.register(self.stop)
+            self._exit_registered = True
+
+    def wake(self):
+        """Run the next pass now instead of waiting for the interval."""
+        if self._event is not None:
+            self._event.set()
+
+    @property
+    def stopped(self):
+        """True once stop() was called (the current pass is the last one)."""
+        return self._stopped
+
+    def stop(self):
+        """Stop the loop and run one last pass."""
+        self._stopped = True
+        self.wake()
+        self.run_once()
+
+    def run_once(self):
+        with self._run_lock:
+            try:
+                self.func()
+            except Exception as e:
+                print(f"{self.name} error: {e}")
+
+    def _loop(self):
+        while not self._stopped:
+            self._event.wait(self.interval)
+            self._event.clear()
+            if self._stopped:
+                break
+            self.run_once()
@@ -0,0 +1,178 @@
+# Write-behind boop ingestion for BOOPING App
+# Created by Claude Opus 4.5
+
+import threading
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+
+from config import Config
+from database.db import transaction, USE_POSTGRES
+from database.statements import statement
+from services.background import PeriodicWorker
+from services.counters import get_counters
+from services.metrics import register_collector, gauge
+
+BOOP_COLUMNS = ('sender_id', 'recipient_id', 'paw_style', 'created_at')
+
+UPSERT_USER_STATS = statement('upsert_user_stats', '''
+    INSERT INTO user_stats (user_id, boops_sent, boops_received) VALUES (?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        boops_sent = user_stats.boops_sent + excluded.boops_sent,
+        boops_received = user_stats.boops_received + excluded.boops_received''')
+UPSERT_BOOP_PAIR = statement('upsert_boop_pair', '''
+    INSERT INTO boop_pairs (sender_id, recipient_id, boop_count) VALUES (?, ?, ?)
+    ON CONFLICT (sender_id, recipient_id) DO UPDATE SET
+        boop_count = boop_pairs.boop_count + excluded.boop_count''')
+# Held until commit by every transaction that touches either direction of a
+# pair, so the second one sees the first one's row (PostgreSQL only; SQLite
+# writes are already serialized)
+LOCK_BOOP_PAIR = statement('lock_boop_pair', 'SELECT pg_advisory_xact_lock(?, ?)')
+# Flag both directions once the reverse pair exists (PK lookups only)
+MARK_MUTUAL = statement('mark_mutual', '''
+    UPDATE boop_pairs SET is_mutual = 1
+    WHERE is_mutual = 0
+    AND ((sender_id = ? AND recipient_id = ?) OR (sender_id = ? AND recipient_id = ?))
+    AND EXISTS (
+        SELECT 1 FROM boop_pairs r
+        WHERE r.sender_id = boop_pairs.recipient_id
+        AND r.recipient_id = boop_pairs.sender_id
+    )''')
+
+
+def update_boop_aggregates(tx, boops):
+    """Update per-user counters and boop pairs for (sender_id, recipient_id) pairs.
+
+    Must run in the same transaction as the boop inserts so the counters
+    never disagree with the boops table.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    pairs = Counter()
+    for sender_id, recipient_id in boops:
+        totals[sender_id][0] += 1
+        totals[recipient_id][1] += 1
+        pairs[(sender_id, recipient_id)] += 1
+    if USE_POSTGRES:
+        # Without this, first boops in both directions committing together
+        # each miss the other's row under READ COMMITTED and the pair is never
+        # marked mutual. Sorted, so two batches can't deadlock on each other.
+        tx.executemany(LOCK_BOOP_PAIR, sorted({(min(pair), max(pair)) for pair in pairs}))
+    tx.executemany(
+        UPSERT_USER_STATS,
+        [(user_id, sent, received) for user_id, (sent, received) in totals.items()]
+    )
+    tx.executemany(
+        UPSERT_BOOP_PAIR,
+        [(sender_id, recipient_id, count) for (sender_id, recipient_id), count in pairs.items()]
+    )
+    tx.executemany(
+        MARK_MUTUAL,
+        [(sender_id, recipient_id, recipient_id, sender_id) for sender_id, recipient_id in pairs]
+    )
+
+
+class BoopWriteBuffer:
+    """Bounded in-process queue of boops written in batches.
+
+    A background worker drains the queue every `flush_interval` seconds, or
+    as soon as `max_rows` boops are waiting, and writes each batch in one
+    transaction. Boops still queued when the process dies are lost, which is
+    the trade-off BOOP_DURABILITY = 'buffered' opts into.
+    """
+
+    def __init__(self, flush_interval, max_rows, max_queue):
+        self.max_rows = max_rows
+        self.max_queue = max_queue
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._pending_sent = Counter()
+        self._pending_received = Counter()
+        self._worker = PeriodicWorker('boop-writer', flush_interval, self.flush)
+
+    def add(self, sender_id, recipient_id, paw_style, count=1):
+        """Queue `count` identical boops. Returns False (queuing none) if they don't fit."""
+        created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            if len(self._rows) + count > self.max_queue:
+                return False
+            self._rows.extend([(sender_id, recipient_id, paw_style, created_at)] * count)
+            self._pending_sent[sender_id] += count
+            self._pending_received[recipient_id] += count
+            backlog = len(self._rows)
+        self._worker.start()
+        if backlog >= self.max_rows:
+            self._worker.wake()
+        return True
+
+    def pending_count(self, user_id, direction='sent'):
+        """Boops queued for a user that are not in the database yet."""
+        if direction == 'sent':
+            return self._pending_sent.get(user_id, 0)
+        return self._pending_received.get(user_id, 0)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def flush(self):
+        """Write everything queued so far, one batch per transaction."""
+        while True:
+            with self._lock:
+                if not self._rows:
+                    return
+                batch = [self._rows.popleft()
+                         for _ in range(min(self.max_rows, len(self._rows)))]
+            try:
+                self._write(batch)
+            except Exception:
+                # Put the batch back in order and retry on the next pass
+                with self._lock:
+                    self._rows.extendleft(reversed(batch))
+                raise
+            get_counters().add('total_boops', len(batch))
+            with self._lock:
+                for sender_id, recipient_id, _, _ in batch:
+                    self._decrement(self._pending_sent, sender_id)
+                    self._decrement(self._pending_received, recipient_id)
+
+    def _write(self, batch):
+        with transaction() as tx:
+            tx.insert_many('boops', BOOP_COLUMNS, batch)
+            update_boop_aggregates(tx, [(row[0], row[1]) for row in batch])
+
+    @staticmethod
+    def _decrement(counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+
+_buffer = None
+
+
+def get_buffer():
+    """Get the process-wide boop write buffer."""
+    global _buffer
+    if _buffer is None:
+        _buffer = BoopWriteBuffer(
+            flush_interval=Config.BOOP_FLUSH_INTERVAL_MS / 1000,
+            max_rows=Config.BOOP_FLUSH_MAX_ROWS,
+            max_queue=Config.BOOP_QUEUE_MAX
+        )
+    return _buffer
+
+
+def is_buffered():
+    """Whether boops are written behind (BOOP_DURABILITY = 'buffered')."""
+    return Config.BOOP_DURABILITY == 'buffered'
+
+
+def pending_count(user_id, direction='sent'):
+    """Queued-but-unwritten boops for a user (0 in sync mode)."""
+    if _buffer is None:
+        return 0
+    return _buffer.pending_count(user_id, direction)
+
+
+@register_collector
+def _collect_queue_depth():
+    return gauge('booping_boop_queue_depth', 'Boops queued for the next buffered write.',
+                 len(_buffer) if _buffer is not None else 0)
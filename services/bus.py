@@ -0,0 +1,162 @@
+# Cross-process message bus for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Lets several app workers share Socket.IO rooms: an emit to user_{id} on
+# one worker is published on the bus and delivered by whichever worker the
+# recipient is connected to.
+#
+#   SOCKETIO_MESSAGE_QUEUE=local:///tmp/booping-bus.sock  - bundled Unix-socket broker
+#   SOCKETIO_MESSAGE_QUEUE=redis://...                     - Redis (needs the redis package)
+#
+# Run the local broker with: python -m services.bus /tmp/booping-bus.sock
+
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+
+import socketio
+
+_HEADER = struct.Struct('!I')
+
+# First frame on every connection says what it is for
+ROLE_PUBLISH = b'pub'
+ROLE_SUBSCRIBE = b'sub'
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Bus connection closed')
+        data += chunk
+    return data
+
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+def _frame(payload):
+    return _HEADER.pack(len(payload)) + payload
+
+
+class LocalBrokerManager(socketio.PubSubManager):
+    """Socket.IO client manager that publishes through the local broker."""
+
+    name = 'local'
+
+    def __init__(self, path, channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = path
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _socket_module(self):
+        # Unpatched eventlet (python app.py) still needs green sockets here
+        if self.server is not None and self.server.async_mode == 'eventlet':
+            from eventlet.green import socket as green_socket
+            return green_socket
+        return socket
+
+    def _connect(self, role):
+        module = self._socket_module()
+        sock = module.socket(module.AF_UNIX, module.SOCK_STREAM)
+        sock.connect(self.path)
+        sock.sendall(_frame(role))
+        return sock
+
+    def _publish(self, data):
+        payload = _frame(json.dumps(data, default=str).encode())
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect(ROLE_PUBLISH)
+                    self._publisher.sendall(payload)
+                    return
+                except OSError as e:
+                    self._publisher = None
+                    if attempt:
+                        self._get_logger().error(f'Message bus publish failed: {e}')
+
+    def _listen(self):
+        while True:
+            try:
+                sock = self._connect(ROLE_SUBSCRIBE)
+            except OSError as e:
+                self._get_logger().error(f'Cannot reach message bus at {self.path}: {e}')
+                self.server.sleep(1)
+                continue
+            try:
+                while True:
+                    yield json.loads(_recv_frame(sock))
+            except (OSError, ConnectionError, ValueError):
+                sock.close()
+                self.server.sleep(1)
+
+
+def socketio_options(url):
+    """Keyword arguments for SocketIO.init_app() for a message queue URL."""
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalBrokerManager(url[len('local://'):])}
+    return {'message_queue': url}
+
+
+def run_broker(path):
+    """Fan every frame out to all connected workers.
+
+    Senders receive their own frames too; PubSubManager skips messages that
+    carry its own host id.
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen()
+
+    subscribers = {}  # socket -> send lock
+    lock = threading.Lock()
+
+    def broadcast(frame):
+        with lock:
+            targets = list(subscribers.items())
+        for target, send_lock in targets:
+            try:
+                with send_lock:
+                    target.sendall(frame)
+            except OSError:
+                with lock:
+                    subscribers.pop(target, None)
+
+    def serve(client):
+        try:
+            role = _recv_frame(client)
+            if role == ROLE_SUBSCRIBE:
+                with lock:
+                    subscribers[client] = threading.Lock()
+            while True:
+                # Subscribers never send, so this just waits for them to hang up
+                broadcast(_frame(_recv_frame(client)))
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            with lock:
+                subscribers.pop(client, None)
+            client.close()
+
+    print(f"Message bus listening on {path}")
+    while True:
+        client, _ = server.accept()
+        threading.Thread(target=serve, args=(client,), daemon=True).start()
+
+
+if __name__ == '__main__':
+    run_broker(sys.argv[1] if len(sys.argv) > 1 else '/tmp/booping-bus.sock')
@@ -0,0 +1,188 @@
+# Global boop/user counters for BOOPING App
+# Created by Claude Opus 4.5
+
+import threading
+import time
+from collections import Counter
+
+from config import Config
+from database.db import query_db, execute_db, transaction, USE_POSTGRES
+from database.statements import statement
+from services import background
+from services.background import PeriodicWorker
+
+COUNTER_NAMES = ('total_boops', 'total_users')
+
+ADD_GLOBAL_TOTALS = statement('add_global_totals', '''
+    UPDATE global_stats
+    SET total_boops = total_boops + ?, total_users = total_users + ?,
+        last_updated = CURRENT_TIMESTAMP
+    WHERE id = 1''')
+READ_GLOBAL_STATS = statement(
+    'read_global_stats', 'SELECT total_boops, total_users, last_updated FROM global_stats WHERE id = 1'
+)
+
+
+class GlobalCounters:
+    """Contention-free front for the single global_stats row.
+
+    Increments are accumulated in memory per worker and folded into the row
+    with one UPDATE every `flush_interval` seconds, so writers never queue
+    on the row lock. Reads come from a short-lived cached copy of the row
+    plus this worker's unflushed increments, including those of a flush
+    that hasn't committed yet, so totals never go backwards.
+    """
+
+    def __init__(self, flush_interval, cache_ttl, reconcile_interval):
+        self.cache_ttl = cache_ttl
+        self._deltas = Counter()
+        self._flushing = Counter()  # popped from _deltas, UPDATE not committed yet
+        self._generation = 0        # bumped when a flush starts or ends
+        self._lock = threading.Lock()
+        self._cached = None
+        self._cached_at = 0.0
+        self._worker = PeriodicWorker('global-counters', flush_interval, self.flush)
+        self._reconciler = None
+        if reconcile_interval:
+            self._reconciler = PeriodicWorker('global-counters-reconcile', reconcile_interval, self.reconcile)
+
+    def add(self, name, amount=1):
+        """Count `amount` new boops/users towards a global total."""
+        with self._lock:
+            self._deltas[name] += amount
+        self._worker.start()
+        if self._reconciler:
+            self._reconciler.start()
+
+    def flush(self):
+        """Fold accumulated increments into global_stats."""
+        with self._lock:
+            deltas = {name: self._deltas.pop(name, 0) for name in COUNTER_NAMES}
+            if not any(deltas.values()):
+                return
+            self._flushing.update(deltas)
+            self._generation += 1
+        try:
+            execute_db(ADD_GLOBAL_TOTALS, (deltas['total_boops'], deltas['total_users']))
+        except Exception:
+            with self._lock:
+                self._flushing.subtract(deltas)
+                self._deltas.update(deltas)
+                self._generation += 1
+            raise
+        with self._lock:
+            self._flushing.subtract(deltas)
+            # The cached row predates this flush (see read)
+            if self._cached is not None:
+                for name in COUNTER_NAMES:
+                    self._cached[name] += deltas[name]
+            self._generation += 1
+
+    def read(self):
+        """Get global totals from cache (refreshed every `cache_ttl` seconds)."""
+        while True:
+            with self._lock:
+                cached = self._cached
+                if cached is not None and time.monotonic() - self._cached_at <= self.cache_ttl:
+                    break
+                generation = self._generation
+            row = query_db(READ_GLOBAL_STATS, one=True)
+            with self._lock:
+                if self._generation == generation and not any(self._flushing.values()):
+                    cached = self._cached = {
+                        'total_boops': row['total_boops'] if row else 0,
+                        'total_users': row['total_users'] if row else 0,
+                        'last_updated': row['last_updated'] if row else None
+                    }
+                    self._cached_at = time.monotonic()
+                    break
+                if self._cached is not None:
+                    # A flush overlapped the read; keep the copy it updates
+                    cached = self._cached
+                    break
+            # The first read overlapped a flush and may or may not include it
+            background.sleep(0.05)
+        with self._lock:
+            # Copy under the lock: a flush committing now moves its increments
+            # from _flushing into the cached row
+            stats = dict(self._cached or cached)
+            for name in COUNTER_NAMES:
+                stats[name] += self._deltas.get(name, 0) + self._flushing.get(name, 0)
+        return stats
+
+    def reconcile(self):
+        """Correct global_stats to COUNT(*) on boops and users.
+
+        The correction is applied as a delta in the same transaction that
+        took the snapshot, so a flush from another worker is never
+        overwritten. Increments other workers haven't flushed yet are
+        already in COUNT(*), so they overshoot until the next reconcile.
+        Returns the drift that was corrected, as {name: (old, new)}.
+        """
+        # Get buffered boops and pending increments into the tables first
+        from services import boop_writer
+        if boop_writer.is_buffered():
+            boop_writer.get_buffer().flush()
+        self.flush()
+
+        drift = {}
+        with transaction() as tx:
+            # Lock the row so no flush lands between the snapshot and the correction
+            before = tx.execute(
+                'SELECT total_boops, total_users FROM global_stats WHERE id = 1'
+                + (' FOR UPDATE' if USE_POSTGRES else '')
+            ).fetchone()
+            actual = tx.execute(
+                'SELECT (SELECT COUNT(*) FROM boops), (SELECT COUNT(*) FROM users)'
+            ).fetchone()
+            if before is None:
+                return drift
+            for i, name in enumerate(COUNTER_NAMES):
+                if before[i] != actual[i]:
+                    drift[name] = (before[i], actual[i])
+            if drift:
+                tx.execute(ADD_GLOBAL_TOTALS, (actual[0] - before[0], actual[1] - before[1]))
+        if drift:
+            print(f"Global stats reconciled: {drift}")
+        self._cached = None
+        return drift
+
+
+class StatsTicker:
+    """Pushes global totals to the 'global' room once per tick.
+
+    Every connected client joins that room, so stats cost one read and one
+    broadcast per tick however many boops are sent. Each worker ticks for
+    its own clients, so the broadcast skips the message queue.
+    """
+
+    def __init__(self, socketio, interval):
+        self.socketio = socketio
+        self._last = None
+        self._worker = PeriodicWorker('global-stats-ticker', interval, self.tick)
+
+    def start(self):
+        self._worker.start()
+
+    def tick(self):
+        stats = get_counters().read()
+        totals = {name: stats[name] for name in COUNTER_NAMES}
+        if totals == self._last:
+            return
+        self._last = totals
+        self.socketio.emit('global_stats', totals, to='global', ignore_queue=True)
+
+
+_counters = None
+
+
+def get_counters():
+    """Get the process-wide global counters."""
+    global _counters
+    if _counters is None:
+        _counters = GlobalCounters(
+            flush_interval=Config.GLOBAL_STATS_FLUSH_SECONDS,
+            cache_ttl=Config.GLOBAL_STATS_CACHE_SECONDS,
+            reconcile_interval=Config.GLOBAL_STATS_RECONCILE_SECONDS
+        )
+    return _counters
@@ -0,0 +1,47 @@
+# Coalesced boop delivery for BOOPING App
+# Created by Claude Opus 4.5
+
+import threading
+
+from services.background import sleep, start_task
+
+
+class BoopCoalescer:
+    """Batch boops per recipient into one socket frame.
+
+    The first boop for a recipient opens a `window`-second window; every boop
+    that arrives before it closes is folded into a count per (sender, paw
+    style), and a single 'boops_received' frame is emitted at the end.
+    """
+
+    def __init__(self, socketio, window):
+        self.socketio = socketio
+        self.window = window
+        self._pending = {}  # recipient_id -> {(sender_id, paw_style): entry}
+        self._lock = threading.Lock()
+
+    def add(self, recipient_id, sender, paw_style, count=1):
+        """Queue `count` boops from sender (a dict with id, display_name, color_theme)."""
+        with self._lock:
+            pending = self._pending.get(recipient_id)
+            opened = pending is None
+            if opened:
+                pending = self._pending[recipient_id] = {}
+            key = (sender['id'], paw_style)
+            entry = pending.get(key)
+            if entry is None:
+                entry = pending[key] = {'sender': sender, 'paw_style': paw_style, 'count': 0}
+            entry['count'] += count
+        if opened:
+            start_task(self._deliver_later, recipient_id)
+
+    def _deliver_later(self, recipient_id):
+        sleep(self.window)
+        with self._lock:
+            pending = self._pending.pop(recipient_id, None)
+        if pending:
+            self.socketio.emit(
+                'boops_received',
+                {'boops': list(pending.values())},
+                to=f'user_{recipient_id}'
+            )
@@ -0,0 +1,101 @@
+# Metrics for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Minimal Prometheus text-format support. Modules that own some state
+# register a collector (a function returning metric lines); /metrics
+# renders them all.
+
+import threading
+from bisect import bisect_left
+
+_collectors = []
+
+
+def register_collector(collector):
+    """Add a function that returns Prometheus lines for /metrics."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+    return collector
+
+
+def render():
+    """Render every registered collector in Prometheus text format."""
+    lines = []
+    for collector in _collectors:
+        try:
+            lines.extend(collector())
+        except Exception as e:
+            print(f"Metrics collector {collector.__name__} failed: {e}")
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def gauge(name, documentation, value, kind='gauge'):
+    """Lines for a single unlabelled gauge (or counter, with kind='counter')."""
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}', f'{name} {value}']
+
+
+def labelled(name, documentation, values, label, kind='gauge'):
+    """Lines for a gauge/counter split by one label, from {label value: value}."""
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for label_value, value in values.items():
+        lines.append(f'{name}{_labels({label: label_value})} {value}')
+    return lines
+
+
+class Histogram:
+    """Prometheus-style histogram, optionally split by one label.
+
+    Series beyond `max_series` label values are folded into 'other' so a
+    bug cannot grow memory without bound.
+    """
+
+    def __init__(self, name, documentation, buckets, label=None, max_series=500):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.max_series = max_series
+        self._series = {}  # label value -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=''):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    label_value = 'other'
+                    series = self._series.get(label_value)
+                if series is None:
+                    series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def totals(self):
+        """{label value: (count, sum)} for every series."""
+        with self._lock:
+            return {key: (series[2], series[1]) for key, series in self._series.items()}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for label_value, (counts, total, count) in sorted(series.items()):
+            labels = {self.label: label_value} if self.label else {}
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_labels(dict(labels, le=bound))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(labels)} {count}')
+        return lines
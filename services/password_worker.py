@@ -0,0 +1,39 @@
+# Password hashing worker process for BOOPING App
+# Created by Claude Opus 4.5
+#
+# Started by services/passwords.py. Reads one JSON request per line on
+# stdin and answers with one JSON line on stdout:
+#   ["hash", password, method]        -> [true, password_hash]
+#   ["verify", password_hash, password] -> [true, matches]
+# Errors come back as [false, message]. Exits when stdin closes.
+
+import json
+import os
+import sys
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+OPERATIONS = {
+    'hash': generate_password_hash,
+    'verify': check_password_hash,
+}
+
+
+def main():
+    if len(sys.argv) > 1:
+        try:
+            os.nice(int(sys.argv[1]))
+        except (AttributeError, OSError, ValueError):
+            pass
+    for line in sys.stdin:
+        try:
+            op, *args = json.loads(line)
+            reply = [True, OPERATIONS[op](*args)]
+        except Exception as e:
+            reply = [False, f'{type(e).__name__}: {e}']
+        sys.stdout.write(json.dumps(reply) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# Password hashing for BOOPING App
+# Created by Claude Opus 4.5
+#
+# scrypt is slow on purpose. Run inline on the eventlet worker, every hash
+# would freeze every socket in the process, so hashes run in a small pool of
+# worker processes (at a lower CPU priority than the app) and the caller
+# waits without blocking the hub. If processes can't be started, hashing
+# falls back to real threads (eventlet's tpool). Logins and registrations
+# also pass through an admission gate, so a login storm queues (or gets
+# turned away) instead of piling up behind boop delivery.
+
+import atexit
+import json
+import os
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from config import Config
+from services import background
+from services.metrics import register_collector, labelled
+
+_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'password_worker.py')
+
+
+class LoginBusy(Exception):
+    """Raised when too many logins are in flight to admit another."""
+
+
+def _method_of(password_hash):
+    """The method prefix of a werkzeug hash, e.g. 'scrypt:32768:8:1'."""
+    return password_hash.split('$', 1)[0]
+
+
+class _WorkerProcess:
+    """One hashing process (services/password_worker.py), one request at a time."""
+
+    def __init__(self, nice):
+        popen = subprocess.Popen
+        if background.async_mode() == 'eventlet':
+            # Green pipes, so waiting for a reply parks only this green
+            # thread, monkey-patched or not
+            from eventlet.green import subprocess as green_subprocess
+            popen = green_subprocess.Popen
+        self.process = popen(
+            [sys.executable, _WORKER_PATH, str(nice)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+        )
+
+    def call(self, op, *args):
+        self.process.stdin.write(json.dumps([op, *args]) + '\n')
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise OSError('password worker exited')
+        ok, value = json.loads(line)
+        if not ok:
+            raise ValueError(value)
+        return value
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except Exception:
+            self.process.kill()
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords off the event loop."""
+
+    def __init__(self, method, workers, max_in_flight, wait_seconds, nice=5):
+        self.method = method
+        self.workers = workers
+        self.wait_seconds = wait_seconds
+        self.nice = nice
+        self._slots = None
+        self._slots_pid = None
+        self._max_in_flight = max_in_flight
+        self._use_processes = workers > 0
+        self._pid = None
+        self._idle = None
+        self._started = []
+        self._lock = threading.Lock()
+        self._exit_registered = False
+
+        # Stats
+        self._in_flight = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._rehashed = 0
+
+    def _checkout(self):
+        """An idle worker process, starting one if the pool isn't full yet."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Processes started before a fork belong to the parent
+                self._pid = os.getpid()
+                self._idle = background.make_queue()
+                self._started = []
+                if not self._exit_registered:
+                    atexit.register(self.close)
+                    self._exit_registered = True
+            start = self._idle.empty() and len(self._started) < self.workers
+            if start:
+                self._started.append(None)
+        if not start:
+            return self._idle.get()
+        try:
+            worker = _WorkerProcess(self.nice)
+        except Exception:
+            with self._lock:
+                self._started.remove(None)
+            raise
+        with self._lock:
+            self._started[self._started.index(None)] = worker
+        return worker
+
+    def _discard(self, worker):
+        with self._lock:
+            if worker in self._started:
+                self._started.remove(worker)
+        worker.close()
+
+    def _call(self, op, *args):
+        for attempt in range(2):
+            worker = self._checkout()
+            try:
+                result = worker.call(op, *args)
+            except OSError:
+                # The process died; retry once on a fresh one
+                self._discard(worker)
+                if attempt:
+                    raise
+                continue
+            self._idle.put(worker)
+            return result
+
+    def _run(self, op, func, *args):
+        if self._use_processes:
+            try:
+                return self._call(op, *args)
+            except OSError as e:
+                print(f"Password hashing processes unavailable ({e}); using threads")
+                self._use_processes = False
+        if background.async_mode() == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(func, *args)
+        return func(*args)
+
+    def _get_slots(self):
+        """The login slots, made once per process on the configured async mode."""
+        with self._lock:
+            if self._slots_pid != os.getpid():
+                self._slots_pid = os.getpid()
+                self._slots = background.Semaphore(self._max_in_flight)
+            return self._slots
+
+    @contextmanager
+    def admit(self):
+        """Hold a login slot for the block; raises LoginBusy if none frees up in time."""
+        slots = self._get_slots()
+        if not slots.acquire(timeout=self.wait_seconds):
+            self._rejected += 1
+            raise LoginBusy()
+        self._admitted += 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            slots.release()
+
+    def hash(self, password):
+        return self._run('hash', generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run('verify', check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when the hash was made with different parameters than the current method."""
+        return _method_of(password_hash) != self.method
+
+    def record_rehash(self):
+        self._rehashed += 1
+
+    def close(self):
+        """Stop the worker processes (they also exit on their own if this process dies)."""
+        if self._pid != os.getpid():
+            return
+        for worker in list(self._started):
+            if worker is not None:
+                self._discard(worker)
+
+    def stats(self):
+        return {
+            'in_flight': self._in_flight,
+            'max_in_flight': self._max_in_flight,
+            'admitted': self._admitted,
+            'rejected': self._rejected,
+            'rehashed': self._rehashed,
+            'processes': len(self._started) if self._use_processes else 0,
+        }
+
+
+_hasher = PasswordHasher(
+    Config.PASSWORD_HASH_METHOD, Config.PASSWORD_HASH_WORKERS,
+    Config.LOGIN_MAX_IN_FLIGHT, Config.LOGIN_WAIT_SECONDS, Config.PASSWORD_HASH_NICE
+)
+
+register_collector(lambda: labelled(
+    'booping_password_hashing', 'Password hashing pool and login admission.', _hasher.stats(), 'stat'
+))
+
+
+def get_hasher():
+    return _hasher
@@ -0,0 +1,154 @@
+# Live presence tracking for BOOPING App
+# Created by Claude Opus 4.5
+
+import os
+import threading
+import time
+import uuid
+
+from config import Config
+from database.db import query_db, execute_db, transaction
+from services.background import PeriodicWorker
+
+
+class DatabasePresenceStore:
+    """Shares each worker's online users through the presence table."""
+
+    def __init__(self):
+        self.worker = f'{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    def publish(self, user_ids, prune=True):
+        """Refresh this worker's rows; with prune, rows for users gone from it are dropped."""
+        now = int(time.time())
+        with transaction() as tx:
+            tx.executemany(
+                '''INSERT INTO presence (user_id, worker, last_seen) VALUES (?, ?, ?)
+                   ON CONFLICT (user_id, worker) DO UPDATE SET last_seen = excluded.last_seen''',
+                [(user_id, self.worker, now) for user_id in user_ids]
+            )
+            if prune:
+                tx.execute('DELETE FROM presence WHERE worker = ? AND last_seen < ?', (self.worker, now))
+
+    def add(self, user_id):
+        self.publish([user_id], prune=False)
+
+    def remove(self, user_id):
+        execute_db('DELETE FROM presence WHERE user_id = ? AND worker = ?', (user_id, self.worker))
+
+    def online_elsewhere(self, user_id, cutoff):
+        row = query_db(
+            'SELECT 1 FROM presence WHERE user_id = ? AND worker != ? AND last_seen >= ? LIMIT 1',
+            (user_id, self.worker, cutoff), one=True
+        )
+        return row is not None
+
+    def online_ids(self, cutoff):
+        rows = query_db('SELECT DISTINCT user_id FROM presence WHERE last_seen >= ?', (cutoff,))
+        return {row['user_id'] for row in rows}
+
+
+class PresenceRegistry:
+    """Who is connected right now, fed by socket connect/disconnect.
+
+    Each user maps to their open sockets (one per tab) and is online while
+    any remain. Sockets that miss heartbeats for `timeout` seconds are
+    expired by sweep(). With a shared store, workers also publish their
+    online users so online_ids() covers every worker.
+    """
+
+    def __init__(self, timeout, store=None):
+        self.timeout = timeout
+        self.store = store
+        self._sockets = {}      # user_id -> {sid: last_seen}
+        self._socket_user = {}  # sid -> user_id
+        self._lock = threading.Lock()
+
+    def connect(self, user_id, sid):
+        """Register a socket. Returns True if the user just came online."""
+        with self._lock:
+            sockets = self._sockets.setdefault(user_id, {})
+            came_online = not sockets
+            sockets[sid] = time.monotonic()
+            self._socket_user[sid] = user_id
+        if came_online and self.store:
+            # Already online through another worker means no delta to send
+            came_online = not self.store.online_elsewhere(user_id, int(time.time() - self.timeout))
+            self.store.add(user_id)
+        return came_online
+
+    def heartbeat(self, sid):
+        with self._lock:
+            user_id = self._socket_user.get(sid)
+            if user_id is not None:
+                self._sockets[user_id][sid] = time.monotonic()
+        return user_id
+
+    def disconnect(self, sid):
+        """Drop a socket. Returns the user id if they just went offline."""
+        with self._lock:
+            user_id = self._drop(sid)
+        return self._went_offline(user_id)
+
+    def sweep(self):
+        """Expire silent sockets. Returns user ids that went offline."""
+        cutoff = time.monotonic() - self.timeout
+        with self._lock:
+            stale = [sid for sockets in self._sockets.values()
+                     for sid, seen in sockets.items() if seen < cutoff]
+            gone = [self._drop(sid) for sid in stale]
+            online = list(self._sockets)
+        if self.store:
+            self.store.publish(online)
+        return [user_id for user_id in gone if self._went_offline(user_id)]
+
+    def online_ids(self):
+        """Ids of users connected right now (O(online users))."""
+        if self.store:
+            return self.store.online_ids(int(time.time() - self.timeout))
+        with self._lock:
+            return set(self._sockets)
+
+    def _drop(self, sid):
+        """Remove a socket (lock held). Returns the user id if it was their last."""
+        user_id = self._socket_user.pop(sid, None)
+        if user_id is None:
+            return None
+        sockets = self._sockets.get(user_id, {})
+        sockets.pop(sid, None)
+        if sockets:
+            return None
+        self._sockets.pop(user_id, None)
+        return user_id
+
+    def _went_offline(self, user_id):
+        if user_id is None:
+            return None
+        if self.store:
+            self.store.remove(user_id)
+            if self.store.online_elsewhere(user_id, int(time.time() - self.timeout)):
+                return None
+        return user_id
+
+
+_registry = None
+
+
+def get_registry():
+    """Get the process-wide presence registry."""
+    global _registry
+    if _registry is None:
+        store = DatabasePresenceStore() if Config.SHARED_STATE_BACKEND == 'database' else None
+        _registry = PresenceRegistry(Config.PRESENCE_TIMEOUT_SECONDS, store)
+    return _registry
+
+
+def make_sweeper(on_offline):
+    """Worker that expires silent sockets every PRESENCE_SWEEP_SECONDS.
+
+    `on_offline` is called with the list of users that went offline.
+    """
+    def sweep():
+        offline = get_registry().sweep()
+        if offline:
+            on_offline(offline)
+    return PeriodicWorker('presence-sweeper', Config.PRESENCE_SWEEP_SECONDS, sweep)
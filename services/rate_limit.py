@@ -0,0 +1,113 @@
+# Rate limiting for BOOPING App
+# Created by Claude Opus 4.5
+
+import threading
+import time
+
+from config import Config
+from database.db import query_db, transaction
+from database.statements import statement
+
+RATE_LIMIT_HIT = statement('rate_limit_hit', '''
+    INSERT INTO rate_limits (bucket, window_start, hits) VALUES (?, ?, ?)
+    ON CONFLICT (bucket, window_start) DO UPDATE SET hits = rate_limits.hits + excluded.hits''')
+RATE_LIMIT_WINDOWS = statement(
+    'rate_limit_windows', 'SELECT window_start, hits FROM rate_limits WHERE bucket = ? AND window_start >= ?'
+)
+
+
+class MemoryBackend:
+    """Per-process window counters (limits hold per worker only)."""
+
+    def __init__(self):
+        self._windows = {}  # key -> [window, current, previous]
+        self._lock = threading.Lock()
+        self._swept_window = None
+
+    def incr(self, key, window, amount):
+        """Add `amount` to the key's current window; return (current, previous)."""
+        with self._lock:
+            if window != self._swept_window:
+                self._sweep(window)
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = self._windows[key] = [window, 0, 0]
+            elif entry[0] != window:
+                # Roll forward: last window becomes previous, older ones drop out
+                entry[2] = entry[1] if entry[0] == window - 1 else 0
+                entry[0], entry[1] = window, 0
+            entry[1] += amount
+            return entry[1], entry[2]
+
+    def _sweep(self, window):
+        """Forget users idle for two full windows (keeps memory bounded)."""
+        self._windows = {k: v for k, v in self._windows.items() if v[0] >= window - 1}
+        self._swept_window = window
+
+
+class DatabaseBackend:
+    """Window counters in the rate_limits table, shared by every worker."""
+
+    def __init__(self):
+        self._swept_window = None
+
+    def incr(self, key, window, amount):
+        with transaction() as tx:
+            tx.execute(RATE_LIMIT_HIT, (key, window, amount))
+            if window != self._swept_window:
+                tx.execute('DELETE FROM rate_limits WHERE window_start < ?', (window - 1,))
+                self._swept_window = window
+        rows = query_db(RATE_LIMIT_WINDOWS, (key, window - 1))
+        hits = {row['window_start']: row['hits'] for row in rows}
+        return hits.get(window, 0), hits.get(window - 1, 0)
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'database': DatabaseBackend,
+}
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counter: O(1) work and two integers per active key.
+
+    The hit count for the trailing window is estimated from the current and
+    previous fixed windows, weighting the previous one by how much of it
+    still overlaps.
+    """
+
+    def __init__(self, limit, window_seconds, backend):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.backend = backend
+
+    def hit(self, key, cost=1):
+        """Record `cost` hits for key. Returns False (and records nothing) if over the limit."""
+        now = time.time()
+        window, offset = divmod(now, self.window_seconds)
+        window = int(window)
+        current, previous = self.backend.incr(key, window, cost)
+        weight = 1 - offset / self.window_seconds
+        if previous * weight + current > self.limit:
+            self.backend.incr(key, window, -cost)
+            return False
+        return True
+
+
+_limiters = {}
+
+
+def get_boop_limiter():
+    """Limiter for sending boops (shared by the socket and REST paths)."""
+    limiter = _limiters.get('boops')
+    if limiter is None:
+        backend = BACKENDS[Config.RATE_LIMIT_BACKEND]()
+        limiter = _limiters['boops'] = SlidingWindowLimiter(
+            Config.MAX_BOOPS_PER_MINUTE, 60, backend
+        )
+    return limiter
+
+
+def allow_boops(user_id, count=1):
+    """Check and record `count` boops against a user's per-minute limit."""
+    return get_boop_limiter().hit(f'boops:{user_id}', count)
@@ -0,0 +1,109 @@
+# Event loop watchdog for BOOPING App
+# Created by Claude Opus 4.5
+
+import os
+import sys
+import time
+import traceback
+
+from config import Config
+from services import background
+from services.metrics import Histogram, gauge, register_collector
+
+BLOCK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _os_primitives():
+    """Real OS threading/_thread/time modules, even after eventlet monkey patching."""
+    try:
+        from eventlet import patcher
+        return patcher.original('threading'), patcher.original('_thread'), patcher.original('time')
+    except ImportError:
+        import _thread
+        import threading
+        return threading, _thread, time
+
+
+class HubWatchdog:
+    """Detects the eventlet hub being blocked and captures what blocked it.
+
+    A green thread ticks every `interval` seconds. A real OS thread watches
+    the ticks; when one is more than `threshold` seconds late, the hub is
+    stuck in some call that never yields, and the watchdog grabs the hub
+    thread's current stack. When the tick finally runs, the episode is
+    logged with that stack and recorded in a histogram.
+
+    Cost: one green wakeup and one OS thread wakeup per interval.
+    """
+
+    def __init__(self, threshold, interval=None):
+        self.threshold = threshold
+        self.interval = interval or max(threshold / 4, 0.01)
+        self.blocks = Histogram('booping_hub_blocked_seconds',
+                                'Event loop stalls longer than the watchdog threshold.', BLOCK_BUCKETS)
+        self.last_lag = 0.0
+        self.last_stack = None
+        self._last_tick = None
+        self._hub_thread = None
+        self._captured = None  # (tick the stall started after, stack)
+        self._pid = None
+
+    def start(self):
+        """Start watching (once per process; no-op unless running on eventlet)."""
+        if not self.threshold or self._pid == os.getpid() or background.async_mode() != 'eventlet':
+            return
+        self._pid = os.getpid()
+        self._last_tick = time.monotonic()
+        background.start_task(self._tick)
+        os_threading, _, _ = _os_primitives()
+        os_threading.Thread(target=self._watch, name='hub-watchdog', daemon=True).start()
+
+    def _tick(self):
+        _, os_thread, _ = _os_primitives()
+        self._hub_thread = os_thread.get_ident()
+        while True:
+            previous = self._last_tick
+            background.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            self.last_lag = max(0.0, now - previous - self.interval)
+            if self.last_lag >= self.threshold:
+                self._record(previous, self.last_lag)
+
+    def _record(self, since_tick, lag):
+        captured = self._captured
+        self._captured = None
+        stack = captured[1] if captured and captured[0] == since_tick else None
+        self.last_stack = stack
+        self.blocks.observe(lag)
+        print(f"Event loop blocked for {lag * 1000:.0f} ms; running at the time:\n"
+              f"{stack or '  (stack not captured)'}")
+
+    def _watch(self):
+        _, _, os_time = _os_primitives()
+        while True:
+            os_time.sleep(self.interval)
+            last_tick = self._last_tick
+            overdue = time.monotonic() - last_tick - self.interval
+            if overdue < self.threshold or (self._captured and self._captured[0] == last_tick):
+                continue
+            frame = sys._current_frames().get(self._hub_thread)
+            if frame is not None:
+                self._captured = (last_tick, ''.join(traceback.format_stack(frame, limit=25)))
+
+    def collect(self):
+        return self.blocks.render() + gauge(
+            'booping_hub_lag_seconds', 'How late the last watchdog tick ran.', round(self.last_lag, 6)
+        )
+
+
+_watchdog = None
+
+
+def get_watchdog():
+    """Get the process-wide hub watchdog."""
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = HubWatchdog(Config.HUB_BLOCK_THRESHOLD_MS / 1000)
+        register_collector(_watchdog.collect)
+    return _watchdog
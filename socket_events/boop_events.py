@@ -1,30 +1,115 @@
 # WebSocket event handlers for BOOPING App
 # Created by Claude Opus 4.5
 
+import functools
+import threading
+import time
+from collections import Counter
+
+from flask import request
 from flask_socketio import emit, join_room, leave_room
 from flask_login import current_user
-from models.boop import create_boop, get_global_stats, get_user_boops_last_minute
+from models.boop import create_boop, create_boops, get_boop_count
 from models.badge import check_and_award_badges
 from models.user import User
+from services.counters import StatsTicker
+from services.delivery import BoopCoalescer
+from services.presence import get_registry, make_sweeper
+from services.rate_limit import allow_boops
 from config import Config
+from database.db import query_stats
+from services.metrics import Histogram, labelled, register_collector
+
+EVENT_LATENCY = Histogram(
+    'booping_socket_event_seconds', 'Socket event handler latency.',
+    (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0), label='event'
+)
+_in_flight = Counter()
+_in_flight_lock = threading.Lock()
+
+register_collector(lambda: EVENT_LATENCY.render() + labelled(
+    'booping_socket_events_in_flight', 'Socket event handlers running right now.', dict(_in_flight), 'event'
+))
+
+
+def instrumented(event):
+    """Time each call of a socket event handler and count its DB queries."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            with _in_flight_lock:
+                _in_flight[event] += 1
+            query_stats.begin_scope(f'socket {event}')
+            started = time.perf_counter()
+            try:
+                return handler(*args)
+            finally:
+                EVENT_LATENCY.observe(time.perf_counter() - started, event)
+                query_stats.end_scope()
+                with _in_flight_lock:
+                    _in_flight[event] -= 1
+        return wrapper
+    return decorator
+
+
+def _my_stats(user_id):
+    """Sent/received counts for the boop_sent ack (saves the client a GET)."""
+    return {
+        'boops_sent': get_boop_count(user_id, 'sent'),
+        'boops_received': get_boop_count(user_id, 'received')
+    }
 
 
 def register_socket_events(socketio):
     """Register all socket event handlers."""
 
+    coalescer = None
+    if Config.BOOP_COALESCE_MS:
+        coalescer = BoopCoalescer(socketio, Config.BOOP_COALESCE_MS / 1000)
+
+    presence = get_registry()
+
+    def broadcast_presence(online=(), offline=()):
+        socketio.emit('presence', {'online': list(online), 'offline': list(offline)}, to='global')
+
+    sweeper = make_sweeper(lambda offline: broadcast_presence(offline=offline))
+    stats_ticker = StatsTicker(socketio, Config.GLOBAL_STATS_TICK_SECONDS)
+
     @socketio.on('connect')
-    def handle_connect():
+    @instrumented('connect')
+    def handle_connect(auth=None):
         if current_user.is_authenticated:
             # Join user's personal room for notifications
             join_room(f'user_{current_user.id}')
+            join_room('global')
             emit('connected', {'user_id': current_user.id})
 
+            sweeper.start()
+            stats_ticker.start()
+            current_user.update_last_active()
+            if presence.connect(current_user.id, request.sid):
+                broadcast_presence(online=[current_user.id])
+            emit('presence_snapshot', {'online': list(presence.online_ids())})
+
     @socketio.on('disconnect')
+    @instrumented('disconnect')
     def handle_disconnect():
         if current_user.is_authenticated:
             leave_room(f'user_{current_user.id}')
+            leave_room('global')
+            went_offline = presence.disconnect(request.sid)
+            if went_offline is not None:
+                broadcast_presence(offline=[went_offline])
+
+    @socketio.on('heartbeat')
+    @instrumented('heartbeat')
+    def handle_heartbeat():
+        if current_user.is_authenticated:
+            presence.heartbeat(request.sid)
+            current_user.update_last_active()
 
     @socketio.on('send_boop')
+    @instrumented('send_boop')
     def handle_send_boop(data):
         if not current_user.is_authenticated:
             return
@@ -39,10 +124,10 @@ def register_socket_events(socketio):
         recipient = User.get_by_id(recipient_id)
         if not recipient:
             return
+        recipient_id = recipient.id  # the client may send the id as a string
 
         # Rate limiting check
-        recent_boops = get_user_boops_last_minute(current_user.id)
-        if recent_boops >= Config.MAX_BOOPS_PER_MINUTE:
+        if not allow_boops(current_user.id):
             emit('boop_error', {'message': 'Slow down! Too many boops.'})
             return
 
@@ -50,24 +135,83 @@ def register_socket_events(socketio):
         boop_id = create_boop(current_user.id, recipient_id, paw_style)
 
         # Notify the recipient
-        emit('boop_received', {
-            'sender': {
-                'id': current_user.id,
-                'display_name': current_user.display_name,
-                'color_theme': current_user.color_theme,
-                'paw_style': paw_style
-            },
-            'boop_id': boop_id
-        }, room=f'user_{recipient_id}')
+        sender = {
+            'id': current_user.id,
+            'display_name': current_user.display_name,
+            'color_theme': current_user.color_theme
+        }
+        if coalescer:
+            coalescer.add(recipient_id, sender, paw_style)
+        else:
+            emit('boop_received', {
+                'sender': dict(sender, paw_style=paw_style),
+                'boop_id': boop_id
+            }, room=f'user_{recipient_id}')
 
         # Check for new badges
         new_badges = check_and_award_badges(current_user.id)
 
-        # Confirm boop was sent (include stats for sender)
-        stats = get_global_stats()
+        # Confirm boop was sent (global stats arrive on the ticker)
+        emit('boop_sent', {
+            'success': True,
+            'recipient_id': recipient_id,
+            'new_badges': new_badges,
+            'my_stats': _my_stats(current_user.id)
+        })
+
+    @socketio.on('send_boops')
+    @instrumented('send_boops')
+    def handle_send_boops(data):
+        """Several boops to one recipient (clicks the client gathered over a short window).
+
+        One rate-limit debit, one write, one badge check and one
+        notification for the whole batch; send_boop remains for single boops.
+        """
+        if not current_user.is_authenticated:
+            return
+
+        recipient_id = data.get('recipient_id')
+        paw_style = data.get('paw_style', current_user.paw_style)
+        count = data.get('count', 1)
+
+        if not recipient_id:
+            return
+        if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+            return
+        if count > Config.MAX_BOOPS_PER_BATCH:
+            emit('boop_error', {'message': f'At most {Config.MAX_BOOPS_PER_BATCH} boops at once.'})
+            return
+
+        recipient = User.get_by_id(recipient_id)
+        if not recipient:
+            return
+        recipient_id = recipient.id  # the client may send the id as a string
+
+        if not allow_boops(current_user.id, count):
+            emit('boop_error', {'message': 'Slow down! Too many boops.'})
+            return
+
+        create_boops(current_user.id, recipient_id, paw_style, count)
+
+        # One notification for the batch (same frame the coalescer sends)
+        sender = {
+            'id': current_user.id,
+            'display_name': current_user.display_name,
+            'color_theme': current_user.color_theme
+        }
+        if coalescer:
+            coalescer.add(recipient_id, sender, paw_style, count)
+        else:
+            emit('boops_received', {
+                'boops': [{'sender': sender, 'paw_style': paw_style, 'count': count}]
+            }, room=f'user_{recipient_id}')
+
+        new_badges = check_and_award_badges(current_user.id, increment=count)
+
         emit('boop_sent', {
             'success': True,
             'recipient_id': recipient_id,
+            'count': count,
             'new_badges': new_badges,
-            'global_stats': stats
+            'my_stats': _my_stats(current_user.id)
         })
@@ -4,6 +4,15 @@
 // Store favorite IDs for quick lookup
 let favoriteIds = new Set();
 
+// Users shown in the Favorites/Buddies sections (kept out of "Everyone")
+let sectionUserIds = new Set();
+
+// Users connected right now (kept current by presence events)
+let onlineIds = new Set();
+
+// Cursor for the next page of the user directory (null = no more pages)
+let directoryCursor = null;
+
 // Paw emoji mapping
 const pawEmojis = {
     'default': '🐾',
@@ -25,14 +34,14 @@ const pawEmojis = {
     'frog': '🐸'
 };
 
-// Check if user was active recently
-function getActivityClass(lastActive) {
+// Check if user is online now or was active recently
+function getActivityClass(lastActive, userId) {
+    if (onlineIds.has(userId)) return 'user-active';  // Connected right now
     if (!lastActive) return '';
     const now = new Date();
     const active = new Date(lastActive);
     const diffMinutes = (now - active) / (1000 * 60);
 
-    if (diffMinutes < 5) return 'user-active';      // Active in last 5 min
     if (diffMinutes < 60) return 'user-recent';     // Active in last hour
     return '';
 }
@@ -41,9 +50,9 @@ function getActivityClass(lastActive) {
 function createUserCard(user, isFavorite) {
     const starClass = isFavorite ? 'star-btn favorited' : 'star-btn';
     const starIcon = isFavorite ? '★' : '☆';
-    const activityClass = getActivityClass(user.last_active);
+    const activityClass = getActivityClass(user.last_active, user.id);
     return `
-        <div class="user-card ${activityClass}" style="--user-color: ${user.color_theme}" data-user-id="${user.id}">
+        <div class="user-card ${activityClass}" style="--user-color: ${user.color_theme}" data-user-id="${user.id}" data-last-active="${user.last_active || ''}">
             <button class="${starClass}" onclick="toggleFavorite(${user.id}, this)" title="Toggle favorite">
                 ${starIcon}
             </button>
@@ -57,74 +66,114 @@ function createUserCard(user, isFavorite) {
     `;
 }
 
-// Load all user sections
-async function loadUsers() {
+// Load everything the homepage needs in one request
+async function loadBootstrap() {
     try {
-        // Load favorite IDs first
-        const favIdsResponse = await fetch('/api/users/me/favorite-ids');
-        const favIds = await favIdsResponse.json();
-        favoriteIds = new Set(favIds);
-
-        // Load all data in parallel
-        const [usersResponse, favoritesResponse, mutualsResponse] = await Promise.all([
-            fetch('/api/users'),
-            fetch('/api/users/me/favorites'),
-            fetch('/api/users/me/mutuals')
-        ]);
-
-        const allUsers = await usersResponse.json();
-        const favorites = await favoritesResponse.json();
-        const mutuals = await mutualsResponse.json();
-
-        // Get IDs for filtering
-        const favoriteUserIds = new Set(favorites.map(f => f.id));
-        const mutualUserIds = new Set(mutuals.map(m => m.id));
-
-        // Filter "everyone" to exclude favorites and mutuals
-        const everyoneElse = allUsers.filter(u =>
-            !favoriteUserIds.has(u.id) && !mutualUserIds.has(u.id)
-        );
-
-        // Render Favorites section
-        const favoritesSection = document.getElementById('favorites-section');
-        const favoritesList = document.getElementById('favorites-list');
-        if (favorites.length > 0) {
-            favoritesSection.style.display = 'block';
-            favoritesList.innerHTML = favorites.map(user =>
-                createUserCard(user, true)
-            ).join('');
-        } else {
-            favoritesSection.style.display = 'none';
-        }
+        const response = await fetch('/api/bootstrap');
+        const data = await response.json();
 
-        // Render Mutuals section
-        const mutualsSection = document.getElementById('mutuals-section');
-        const mutualsList = document.getElementById('mutuals-list');
-        if (mutuals.length > 0) {
-            mutualsSection.style.display = 'block';
-            mutualsList.innerHTML = mutuals.map(user =>
-                createUserCard(user, favoriteIds.has(user.id))
-            ).join('');
-        } else {
-            mutualsSection.style.display = 'none';
-        }
+        renderUsers(data);
+        updateGlobalCounter(data.global_stats.total_boops);
+        renderMyStats(data.my_stats);
+        renderNewBoops(data.new_boops);
+    } catch (error) {
+        console.error('Failed to load homepage:', error);
+    }
+}
+
+// Render all user sections from bootstrap data
+function renderUsers(data) {
+    // Sections reference user rows by id
+    const lookup = ids => ids.map(id => data.users[id]);
+    const favorites = lookup(data.favorites);
+    const mutuals = lookup(data.buddies);
+    const everyoneElse = lookup(data.everyone);
+
+    favoriteIds = new Set(data.favorite_ids);
+    sectionUserIds = new Set([...data.favorites, ...data.buddies]);
+    directoryCursor = data.next_cursor;
+
+    // Render Favorites section
+    const favoritesSection = document.getElementById('favorites-section');
+    const favoritesList = document.getElementById('favorites-list');
+    if (favorites.length > 0) {
+        favoritesSection.style.display = 'block';
+        favoritesList.innerHTML = favorites.map(user =>
+            createUserCard(user, true)
+        ).join('');
+    } else {
+        favoritesSection.style.display = 'none';
+    }
+
+    // Render Mutuals section
+    const mutualsSection = document.getElementById('mutuals-section');
+    const mutualsList = document.getElementById('mutuals-list');
+    if (mutuals.length > 0) {
+        mutualsSection.style.display = 'block';
+        mutualsList.innerHTML = mutuals.map(user =>
+            createUserCard(user, favoriteIds.has(user.id))
+        ).join('');
+    } else {
+        mutualsSection.style.display = 'none';
+    }
+
+    // Render Everyone section
+    const userList = document.getElementById('user-list');
+    if (everyoneElse.length === 0 && favorites.length === 0 && mutuals.length === 0) {
+        userList.innerHTML = '<div class="loading">No other boopers yet. Invite some friends!</div>';
+    } else if (everyoneElse.length === 0) {
+        userList.innerHTML = '<div class="loading">Everyone is either a favorite or boop buddy!</div>';
+    } else {
+        userList.innerHTML = everyoneElse.map(user =>
+            createUserCard(user, favoriteIds.has(user.id))
+        ).join('');
+    }
+    updateLoadMore();
+}
+
+// Load the next page of the "Everyone" section
+async function loadMoreUsers() {
+    if (!directoryCursor) return;
+    try {
+        const response = await fetch(`/api/users?cursor=${encodeURIComponent(directoryCursor)}`);
+        const directory = await response.json();
+        directoryCursor = directory.next_cursor;
 
-        // Render Everyone section
         const userList = document.getElementById('user-list');
-        if (everyoneElse.length === 0 && favorites.length === 0 && mutuals.length === 0) {
-            userList.innerHTML = '<div class="loading">No other boopers yet. Invite some friends!</div>';
-        } else if (everyoneElse.length === 0) {
-            userList.innerHTML = '<div class="loading">Everyone is either a favorite or boop buddy!</div>';
-        } else {
-            userList.innerHTML = everyoneElse.map(user =>
-                createUserCard(user, favoriteIds.has(user.id))
-            ).join('');
-        }
+        userList.insertAdjacentHTML('beforeend', directory.users
+            .filter(u => !sectionUserIds.has(u.id))
+            .map(user => createUserCard(user, favoriteIds.has(user.id)))
+            .join(''));
+        updateLoadMore();
     } catch (error) {
-        console.error('Failed to load users:', error);
+        console.error('Failed to load more users:', error);
+    }
+}
+
+// Show the "Load more" button while the directory has more pages
+function updateLoadMore() {
+    const loadMore = document.getElementById('load-more');
+    if (loadMore) {
+        loadMore.style.display = directoryCursor ? 'block' : 'none';
     }
 }
 
+// Apply presence changes to the set and any rendered cards
+function updatePresence(online, offline, replace) {
+    if (replace) onlineIds = new Set();
+    online.forEach(id => onlineIds.add(id));
+    offline.forEach(id => onlineIds.delete(id));
+
+    const changed = replace ? null : new Set([...online, ...offline]);
+    document.querySelectorAll('.user-card[data-user-id]').forEach(card => {
+        const userId = Number(card.dataset.userId);
+        if (changed && !changed.has(userId)) return;
+        card.classList.remove('user-active', 'user-recent');
+        const activityClass = getActivityClass(card.dataset.lastActive, userId);
+        if (activityClass) card.classList.add(activityClass);
+    });
+}
+
 // Toggle favorite status
 async function toggleFavorite(userId, button) {
     const isFavorited = favoriteIds.has(userId);
@@ -142,87 +191,63 @@ async function toggleFavorite(userId, button) {
             button.textContent = '★';
         }
         // Reload to update sections
-        loadUsers();
+        loadBootstrap();
     } catch (error) {
         console.error('Failed to toggle favorite:', error);
     }
 }
 
-// Load global stats
-async function loadGlobalStats() {
-    try {
-        const response = await fetch('/api/stats/global');
-        const stats = await response.json();
-        updateGlobalCounter(stats.total_boops);
-    } catch (error) {
-        console.error('Failed to load global stats:', error);
+// Show my sent/received counts
+function renderMyStats(stats) {
+    const myStats = document.getElementById('my-stats');
+    if (myStats) {
+        myStats.textContent = `${stats.boops_sent} sent / ${stats.boops_received} received`;
     }
 }
 
-// Load my stats
-async function loadMyStats() {
-    try {
-        const response = await fetch('/api/users/me/stats');
-        const stats = await response.json();
-        const myStats = document.getElementById('my-stats');
-        if (myStats) {
-            myStats.textContent = `${stats.boops_sent} sent / ${stats.boops_received} received`;
-        }
-    } catch (error) {
-        console.error('Failed to load my stats:', error);
-    }
-}
-
-// Load new boops since last login
-async function loadNewBoops() {
-    try {
-        const response = await fetch('/api/users/me/new-boops');
-        const boops = await response.json();
-
-        if (boops.length > 0) {
-            // Show the banner with total count
-            document.getElementById('new-boops-banner').style.display = 'block';
-            document.getElementById('new-boops-count').textContent = boops.length;
-
-            // Aggregate by sender
-            const grouped = {};
-            boops.forEach(boop => {
-                const senderId = boop.sender_id;
-                if (!grouped[senderId]) {
-                    grouped[senderId] = {
-                        sender_name: boop.sender_name,
-                        paw_style: boop.sender_paw || boop.paw_style,
-                        count: 0,
-                        latest: boop.created_at
-                    };
-                }
-                grouped[senderId].count++;
-                // Keep the most recent timestamp
-                if (boop.created_at > grouped[senderId].latest) {
-                    grouped[senderId].latest = boop.created_at;
-                }
-            });
-
-            // Sort by count (most boops first)
-            const sorted = Object.values(grouped).sort((a, b) => b.count - a.count);
-
-            // Build the list showing count per sender
-            const listHtml = sorted.map(sender => {
-                const pawEmoji = pawEmojis[sender.paw_style] || '🐾';
-                const countText = sender.count > 1 ? ` x${sender.count}` : '';
-                return `
-                    <div class="new-boop-item">
-                        <span class="new-boop-paw">${pawEmoji}</span>
-                        <span class="new-boop-sender">${escapeHtml(sender.sender_name)}</span>
-                        <span class="new-boop-count">${countText}</span>
-                    </div>
-                `;
-            }).join('');
-
-            document.getElementById('new-boops-list').innerHTML = listHtml;
-        }
-    } catch (error) {
-        console.error('Failed to load new boops:', error);
+// Show the banner for boops received since last login
+function renderNewBoops(boops) {
+    if (boops.length > 0) {
+        // Show the banner with total count
+        document.getElementById('new-boops-banner').style.display = 'block';
+        document.getElementById('new-boops-count').textContent = boops.length;
+
+        // Aggregate by sender
+        const grouped = {};
+        boops.forEach(boop => {
+            const senderId = boop.sender_id;
+            if (!grouped[senderId]) {
+                grouped[senderId] = {
+                    sender_name: boop.sender_name,
+                    paw_style: boop.sender_paw || boop.paw_style,
+                    count: 0,
+                    latest: boop.created_at
+                };
+            }
+            grouped[senderId].count++;
+            // Keep the most recent timestamp
+            if (boop.created_at > grouped[senderId].latest) {
+                grouped[senderId].latest = boop.created_at;
+            }
+        });
+
+        // Sort by count (most boops first)
+        const sorted = Object.values(grouped).sort((a, b) => b.count - a.count);
+
+        // Build the list showing count per sender
+        const listHtml = sorted.map(sender => {
+            const pawEmoji = pawEmojis[sender.paw_style] || '🐾';
+            const countText = sender.count > 1 ? ` x${sender.count}` : '';
+            return `
+                <div class="new-boop-item">
+                    <span class="new-boop-paw">${pawEmoji}</span>
+                    <span class="new-boop-sender">${escapeHtml(sender.sender_name)}</span>
+                    <span class="new-boop-count">${countText}</span>
+                </div>
+            `;
+        }).join('');
+
+        document.getElementById('new-boops-list').innerHTML = listHtml;
     }
 }
 
@@ -235,12 +260,9 @@ function sendBoop(recipientId, button) {
     // Create flying paw animation with user's selected paw style
     createFlyingPaw(button, typeof myPawStyle !== 'undefined' ? myPawStyle : 'default');
 
-    // Send via socket (server uses current_user's paw_style)
+    // Send via socket (server uses current_user's paw_style); personal
+    // stats refresh when the server confirms, global stats are pushed
     sendBoopViaSocket(recipientId);
-
-    // Update stats (both personal and global)
-    loadMyStats();
-    loadGlobalStats();
 }
 
 // Create flying paw animation
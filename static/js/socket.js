@@ -3,8 +3,24 @@
 
 let socket = null;
 
+// Most paw animations to replay from one coalesced frame
+const MAX_REPLAYED_PAWS = 10;
+
+// Keeps this tab counted as online (server expires silent sockets after 60s)
+const HEARTBEAT_INTERVAL_MS = 25000;
+
+// Rapid clicks on one user are gathered for this long and sent as one
+// send_boops event (at most MAX_BOOPS_PER_BATCH, as on the server)
+const BOOP_BATCH_WINDOW_MS = 150;
+const MAX_BOOPS_PER_BATCH = 50;
+
+// recipient id -> { count, timer }
+const pendingBoops = new Map();
+
 function initSocket() {
-    socket = io();
+    socket = typeof socketTransports !== 'undefined'
+        ? io({ transports: socketTransports })
+        : io();
 
     socket.on('connect', () => {
         console.log('Connected to BOOPING server!');
@@ -14,18 +30,47 @@ function initSocket() {
         console.log('Disconnected from server');
     });
 
+    // Full online set on (re)connect, then deltas
+    socket.on('presence_snapshot', (data) => {
+        updatePresence(data.online, [], true);
+    });
+
+    socket.on('presence', (data) => {
+        updatePresence(data.online, data.offline, false);
+    });
+
+    // Global totals, pushed about once a second while they change
+    socket.on('global_stats', (data) => {
+        updateGlobalCounter(data.total_boops);
+    });
+
+    setInterval(() => {
+        if (socket.connected) socket.emit('heartbeat');
+    }, HEARTBEAT_INTERVAL_MS);
+
     socket.on('boop_received', (data) => {
         showIncomingBoop(data.sender);
         showNotification(`${data.sender.display_name} booped you!`, data.sender.color_theme);
     });
 
+    // Coalesced frame: counts per sender and paw style
+    socket.on('boops_received', (data) => {
+        let replayed = 0;
+        data.boops.forEach(boop => {
+            const sender = { ...boop.sender, paw_style: boop.paw_style };
+            const times = boop.count > 1 ? ` x${boop.count}` : '';
+            showNotification(`${sender.display_name} booped you!${times}`, sender.color_theme);
+            for (let i = 0; i < boop.count && replayed < MAX_REPLAYED_PAWS; i++, replayed++) {
+                setTimeout(() => showIncomingBoop(sender), replayed * 80);
+            }
+        });
+    });
+
     socket.on('boop_sent', (data) => {
         if (data.success) {
             console.log('Boop sent successfully!');
-            // Update sender's global counter
-            if (data.global_stats) {
-                updateGlobalCounter(data.global_stats.total_boops);
-            }
+            // Counts come with the ack, once per batch
+            renderMyStats(data.my_stats);
         }
         if (data.new_badges && data.new_badges.length > 0) {
             data.new_badges.forEach(badge => showBadgeUnlock(badge));
@@ -34,10 +79,26 @@ function initSocket() {
 }
 
 function sendBoopViaSocket(recipientId) {
-    if (socket) {
-        socket.emit('send_boop', {
-            recipient_id: recipientId
-            // Server uses sender's (current_user's) paw_style
-        });
+    if (!socket) return;
+    let pending = pendingBoops.get(recipientId);
+    if (!pending) {
+        pending = { count: 0, timer: setTimeout(() => flushBoops(recipientId), BOOP_BATCH_WINDOW_MS) };
+        pendingBoops.set(recipientId, pending);
+    }
+    pending.count++;
+    if (pending.count >= MAX_BOOPS_PER_BATCH) {
+        flushBoops(recipientId);
     }
 }
+
+function flushBoops(recipientId) {
+    const pending = pendingBoops.get(recipientId);
+    if (!pending) return;
+    clearTimeout(pending.timer);
+    pendingBoops.delete(recipientId);
+    // Server uses sender's (current_user's) paw_style
+    socket.emit('send_boops', {
+        recipient_id: recipientId,
+        count: pending.count
+    });
+}